@@ -1,8 +1,10 @@
 import os
 import sys
 
-# Ajouter le répertoire courant au chemin Python
-sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+# Ajouter le répertoire courant au chemin Python, une seule fois
+current_dir = os.path.dirname(os.path.abspath(__file__))
+if current_dir not in sys.path:
+    sys.path.insert(0, current_dir)
 
 # Importer et exécuter la fonction main
 from app import main
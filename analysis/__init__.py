@@ -3,8 +3,40 @@ Module d'analyse des charges locatives commerciales.
 """
 import streamlit as st
 from api.openai_client import get_openai_client
+from utils.cache_utils import content_digest, UncachedResult
 
 def analyze_with_openai(text1, text2, document_type):
+    """
+    Analyse les documents, immédiatement ou en traitement différé selon l'option
+    "Traitement différé" de la barre latérale.
+    
+    Args:
+        text1: Texte du bail commercial
+        text2: Texte de la reddition des charges
+        document_type: Type de document (commercial)
+        
+    Returns:
+        Dictionnaire contenant l'analyse complète, ou None si l'analyse a été soumise en traitement différé
+    """
+    if not st.session_state.get("batch_mode", False):
+        return analyze_sync(text1, text2, document_type)
+    
+    try:
+        client = get_openai_client()
+    except Exception:
+        return None
+    
+    jobs = [{"doc_id": "analyse", "text1": text1, "text2": text2}]
+    batch_id = analyze_batch(jobs, client)
+    
+    if batch_id:
+        st.session_state.batch_id = batch_id
+        st.session_state.batch_jobs = jobs
+        st.success(f"✅ Analyse soumise en traitement différé (lot {batch_id}). Les résultats seront disponibles sous 24h.")
+    
+    return None
+
+def analyze_sync(text1, text2, document_type):
     """
     Analyse les documents en suivant une approche structurée en trois étapes.
     
@@ -23,48 +55,12 @@ def analyze_with_openai(text1, text2, document_type):
         # Initialiser le client OpenAI
         client = get_openai_client()
         
-        # Import à l'intérieur de la fonction pour éviter les imports circulaires
-        from analysis.bail_analyzer import extract_refacturable_charges_from_bail, retry_extract_refacturable_charges
-        from analysis.charges_analyzer import extract_charged_amounts_from_reddition, extract_charged_amounts_fallback
-        from analysis.conformity_analyzer import analyse_charges_conformity, retry_analyse_conformity, final_attempt_complete_analysis
-        
-        with st.spinner("Étape 1/3: Extraction des charges refacturables du bail..."):
-            # Extraire les charges refacturables mentionnées dans le bail
-            refacturable_charges = extract_refacturable_charges_from_bail(text1, client)
-            
-            if refacturable_charges:
-                st.success(f"✅ {len(refacturable_charges)} postes de charges refacturables identifiés dans le bail")
-            else:
-                st.warning("⚠️ Aucune charge refacturable clairement identifiée dans le bail")
-                # Deuxième tentative avec un prompt différent
-                refacturable_charges = retry_extract_refacturable_charges(text1, client)
-        
-        with st.spinner("Étape 2/3: Extraction des montants facturés..."):
-            # Extraire les montants facturés mentionnés dans la reddition
-            charged_amounts = extract_charged_amounts_from_reddition(text2, client)
-            
-            if charged_amounts:
-                total = sum(charge.get("montant", 0) for charge in charged_amounts)
-                st.success(f"✅ {len(charged_amounts)} postes de charges facturés identifiés, pour un total de {total:.2f}€")
-            else:
-                st.warning("⚠️ Aucun montant facturé clairement identifié dans la reddition des charges")
-                # Deuxième tentative avec une méthode alternative
-                charged_amounts = extract_charged_amounts_fallback(text2, client)
-        
-        with st.spinner("Étape 3/3: Analyse de la conformité..."):
-            # Analyser la conformité entre les charges refacturables et facturées
-            result = analyse_charges_conformity(refacturable_charges, charged_amounts, client)
-            
-            if result and "analyse_globale" in result and "taux_conformite" in result["analyse_globale"]:
-                conformity = result["analyse_globale"]["taux_conformite"]
-                st.success(f"✅ Analyse complète avec un taux de conformité de {conformity}%")
-            else:
-                st.warning("⚠️ Analyse de conformité incomplète - nouvelle tentative...")
-                # Deuxième tentative avec approche différente
-                result = retry_analyse_conformity(refacturable_charges, charged_amounts, client)
-        
-        return result
+        # Résultat mis en cache selon le contenu des documents
+        digest = content_digest(f"{document_type}\x00{text1}\x00{text2}".encode("utf-8"))
+        return _analyze_sync_cached(digest, text1, text2, client)
     
+    except UncachedResult as e:
+        return e.value
     except Exception as e:
         st.error(f"Erreur lors de l'analyse: {str(e)}")
         
@@ -88,3 +84,177 @@ def analyze_with_openai(text1, text2, document_type):
                     "Essayez à nouveau plus tard."
                 ]
             }
+
+@st.cache_data(show_spinner=False, ttl=24 * 3600, max_entries=128)
+def _analyze_sync_cached(digest, _text1, _text2, _client):
+    """
+    Exécute les trois étapes de l'analyse, avec mise en cache du résultat.
+    Un résultat incomplet est renvoyé sans être mis en cache.
+    
+    Args:
+        digest: Empreinte du type de document et des deux textes (clé de cache)
+        _text1: Texte du bail commercial
+        _text2: Texte de la reddition des charges
+        _client: Client OpenAI
+        
+    Returns:
+        Dictionnaire contenant l'analyse complète
+    """
+    result = _run_three_steps(_text1, _text2, _client)
+    if not result or "analyse_globale" not in result:
+        raise UncachedResult(result)
+    return result
+
+def _run_three_steps(text1, text2, client):
+    """
+    Enchaîne l'extraction des charges refacturables et facturées puis l'analyse de conformité.
+    
+    Args:
+        text1: Texte du bail commercial
+        text2: Texte de la reddition des charges
+        client: Client OpenAI
+        
+    Returns:
+        Dictionnaire contenant l'analyse complète
+    """
+    # Import à l'intérieur de la fonction pour éviter les imports circulaires
+    from analysis.bail_analyzer import extract_refacturable_charges_from_bail, retry_extract_refacturable_charges
+    from analysis.charges_analyzer import extract_charged_amounts_from_reddition, extract_charged_amounts_fallback
+    from analysis.conformity_analyzer import analyse_charges_conformity, retry_analyse_conformity, final_attempt_complete_analysis
+    
+    from utils.concurrency import run_in_threads
+    
+    # Les étapes s'exécutent dans des threads: elles renvoient leurs messages au lieu de
+    # les afficher, l'affichage restant sur le thread du script
+    def extract_refacturable_step():
+        # Extraire les charges refacturables mentionnées dans le bail
+        charges = extract_refacturable_charges_from_bail(text1, client)
+        
+        if charges:
+            return charges, [(st.success, f"✅ {len(charges)} postes de charges refacturables identifiés dans le bail")]
+        
+        # Deuxième tentative avec un prompt différent
+        charges = retry_extract_refacturable_charges(text1, client)
+        return charges, [(st.warning, "⚠️ Aucune charge refacturable clairement identifiée dans le bail")]
+    
+    def extract_charged_step():
+        # Extraire les montants facturés mentionnés dans la reddition
+        charges = extract_charged_amounts_from_reddition(text2, client)
+        
+        if charges:
+            total = sum(charge.get("montant", 0) for charge in charges)
+            return charges, [(st.success, f"✅ {len(charges)} postes de charges facturés identifiés, pour un total de {total:.2f}€")]
+        
+        # Deuxième tentative avec une méthode alternative
+        charges = extract_charged_amounts_fallback(text2, client)
+        return charges, [(st.warning, "⚠️ Aucun montant facturé clairement identifié dans la reddition des charges")]
+    
+    steps = [
+        ("Étape 1/3: Extraction des charges refacturables du bail", extract_refacturable_step),
+        ("Étape 2/3: Extraction des montants facturés", extract_charged_step),
+    ]
+    statuses = [st.status(f"{label}...", expanded=True) for label, _ in steps]
+    
+    # Les étapes 1 et 2 sont indépendantes: elles s'exécutent simultanément
+    step_results = run_in_threads(lambda step: step[1](), steps)
+    
+    extracted = []
+    for (label, _), status, (charges, messages) in zip(steps, statuses, step_results):
+        with status:
+            for notify, message in messages:
+                notify(message)
+        status.update(label=label, state="complete", expanded=False)
+        extracted.append(charges)
+    refacturable_charges, charged_amounts = extracted
+    
+    label = "Étape 3/3: Analyse de la conformité"
+    with st.status(f"{label}...", expanded=True) as status:
+        # Analyser la conformité entre les charges refacturables et facturées
+        result = analyse_charges_conformity(refacturable_charges, charged_amounts, client)
+        
+        if result and "analyse_globale" in result and "taux_conformite" in result["analyse_globale"]:
+            conformity = result["analyse_globale"]["taux_conformite"]
+            st.success(f"✅ Analyse complète avec un taux de conformité de {conformity}%")
+        else:
+            st.warning("⚠️ Analyse de conformité incomplète - nouvelle tentative...")
+            # Deuxième tentative avec approche différente
+            result = retry_analyse_conformity(refacturable_charges, charged_amounts, client)
+        
+        status.update(label=label, state="complete", expanded=False)
+    
+    return result
+
+def analyze_batch(jobs, client):
+    """
+    Soumet les extractions de plusieurs analyses à l'API Batch d'OpenAI (coût réduit de moitié).
+    Seules les extractions du bail et de la reddition sont soumises: l'analyse de conformité,
+    qui dépend des deux, est réalisée à la récupération des résultats.
+    
+    Args:
+        jobs: Liste de dictionnaires {"doc_id": ..., "text1": texte du bail, "text2": texte de la reddition}
+        client: Client OpenAI
+        
+    Returns:
+        Identifiant du lot soumis, ou None en cas d'échec
+    """
+    from api.openai_batch import submit_batch
+    from analysis.bail_analyzer import build_refacturable_charges_prompt
+    from analysis.charges_analyzer import build_charged_amounts_prompt, preprocess_charges_text
+    
+    prompts = []
+    for job in jobs:
+        prompts.append({
+            "custom_id": f"{job['doc_id']}-bail",
+            "prompt": build_refacturable_charges_prompt(job["text1"]),
+            "temperature": 0.1
+        })
+        prompts.append({
+            "custom_id": f"{job['doc_id']}-charges",
+            "prompt": build_charged_amounts_prompt(preprocess_charges_text(job["text2"])),
+            "temperature": 0
+        })
+    
+    with st.spinner("Soumission des requêtes au traitement différé..."):
+        return submit_batch(client, prompts)
+
+def fetch_batch_extractions(batch_id, jobs, client):
+    """
+    Récupère les extractions d'un lot terminé, avec repli sur l'analyse locale.
+    
+    Args:
+        batch_id: Identifiant du lot
+        jobs: Liste des analyses soumises avec analyze_batch
+        client: Client OpenAI
+        
+    Returns:
+        Tuple (statut du lot, dictionnaire {doc_id: (charges refacturables, charges facturées)}
+        ou None si le lot n'est pas terminé)
+    """
+    from api.openai_batch import poll_batch
+    from api.openai_client import parse_json_response
+    from analysis.bail_analyzer import parse_refacturable_charges
+    from analysis.charges_analyzer import validate_charged_amounts
+    from analysis.local_bail_analyzer import extract_refacturable_charges_locally, extract_charged_amounts_locally
+    
+    status, responses = poll_batch(client, batch_id)
+    if responses is None:
+        return status, None
+    
+    extractions = {}
+    for job in jobs:
+        doc_id = job["doc_id"]
+        
+        refacturable_charges = parse_refacturable_charges(responses.get(f"{doc_id}-bail"))
+        if not refacturable_charges:
+            refacturable_charges = extract_refacturable_charges_locally(job["text1"])
+        
+        charges_result = parse_json_response(responses.get(f"{doc_id}-charges"), default_value={})
+        charged_amounts = []
+        if isinstance(charges_result, dict) and isinstance(charges_result.get("charges"), list):
+            charged_amounts = validate_charged_amounts(charges_result["charges"])
+        if not charged_amounts:
+            charged_amounts = extract_charged_amounts_locally(job["text2"])
+        
+        extractions[doc_id] = (refacturable_charges, charged_amounts)
+    
+    return status, extractions
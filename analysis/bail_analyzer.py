@@ -3,7 +3,8 @@ Module d'analyse des clauses de charges dans les baux commerciaux.
 """
 import streamlit as st
 from api.openai_client import send_openai_request, parse_json_response
-from config import MAX_BAIL_CHARS
+from config import MAX_BAIL_TOKENS
+from utils.token_trim import trim_to_tokens
 
 def extract_charges_clauses_with_ai(bail_text, client):
     """
@@ -40,7 +41,7 @@ def extract_charges_clauses_with_ai(bail_text, client):
         
         Bail à analyser:
         ```
-        {bail_text[:MAX_BAIL_CHARS]}
+        {trim_to_tokens(bail_text, MAX_BAIL_TOKENS)}
         ```
         """
         
@@ -53,14 +54,82 @@ def extract_charges_clauses_with_ai(bail_text, client):
         
         # Si l'extraction a échoué ou renvoie un texte trop court, utiliser le texte original
         if not extracted_text or len(extracted_text) < 200:
-            return bail_text[:MAX_BAIL_CHARS]  # Limiter à 15000 caractères en cas d'échec
+            return trim_to_tokens(bail_text, MAX_BAIL_TOKENS)  # Limiter au budget de tokens en cas d'échec
             
         return extracted_text
         
     except Exception as e:
         # En cas d'erreur, utiliser le texte original tronqué
         st.warning(f"Extraction intelligente des clauses non disponible: {str(e)}")
-        return bail_text[:MAX_BAIL_CHARS]
+        return trim_to_tokens(bail_text, MAX_BAIL_TOKENS)
+
+def build_refacturable_charges_prompt(relevant_bail_text):
+    """
+    Construit le prompt d'extraction des charges refacturables.
+    
+    Args:
+        relevant_bail_text: Texte des clauses du bail concernant les charges
+        
+    Returns:
+        Prompt à envoyer à l'API
+    """
+    # Prompt spécifique pour extraire uniquement les charges refacturables
+    prompt = f"""
+    ## Tâche d'extraction précise
+    Tu es un analyste juridique spécialisé dans les baux commerciaux.
+    
+    Ta seule tâche est d'extraire la liste précise des charges qui sont explicitement mentionnées comme refacturables au locataire dans le bail commercial en détaillant les différentes catégories que tu identifies dans les charges locatives.
+    
+    Voici les clauses du bail concernant les charges:
+    ```
+    {trim_to_tokens(relevant_bail_text, MAX_BAIL_TOKENS)}
+    ```
+    
+    ## Instructions précises
+    1. Identifie uniquement les postes et catégories de charges expressément mentionnés comme refacturables au locataire
+    2. Liste chacun de ces postes ou catégories, et ne t'arrête pas à une catégorie généraliste comme "charges locatives"
+    3. N'invente aucun poste de charge qui ne serait pas explicitement mentionné
+    4. Si une charge est ambiguë ou implicite, indique-le clairement
+    
+    ## Format attendu (JSON)
+    ```
+    [
+        {{
+            "categorie": "Catégorie exacte mentionnée dans le bail",
+            "description": "Description exacte de la charge, telle que rédigée dans le bail",
+            "base_legale": "Article X.X ou clause Y du bail",
+            "certitude": "élevée|moyenne|faible"
+        }}
+    ]
+    ```
+    
+    Si aucune charge refacturable n'est mentionnée dans le bail, retourne un tableau vide.
+    """
+    
+    return prompt
+
+def parse_refacturable_charges(response_text):
+    """
+    Extrait la liste des charges refacturables d'une réponse de l'API.
+    
+    Args:
+        response_text: Texte de la réponse JSON
+        
+    Returns:
+        Liste de dictionnaires contenant les charges refacturables
+    """
+    result = parse_json_response(response_text, default_value=[])
+    
+    # Vérifier si le résultat est une liste directe ou s'il est encapsulé
+    if isinstance(result, dict) and any(k for k in result.keys() if "charge" in k.lower()):
+        for key in result.keys():
+            if "charge" in key.lower() and isinstance(result[key], list):
+                return result[key]
+    elif isinstance(result, list):
+        return result
+    
+    # Cas où le format ne correspond pas à ce qui est attendu
+    return []
 
 def extract_refacturable_charges_from_bail(bail_text, client):
     """
@@ -78,38 +147,7 @@ def extract_refacturable_charges_from_bail(bail_text, client):
             # Extraction des clauses pertinentes d'abord
             relevant_bail_text = extract_charges_clauses_with_ai(bail_text, client)
             
-            # Prompt spécifique pour extraire uniquement les charges refacturables
-            prompt = f"""
-            ## Tâche d'extraction précise
-            Tu es un analyste juridique spécialisé dans les baux commerciaux.
-            
-            Ta seule tâche est d'extraire la liste précise des charges qui sont explicitement mentionnées comme refacturables au locataire dans le bail commercial en détaillant les différentes catégories que tu identifies dans les charges locatives.
-            
-            Voici les clauses du bail concernant les charges:
-            ```
-            {relevant_bail_text[:MAX_BAIL_CHARS]}
-            ```
-            
-            ## Instructions précises
-            1. Identifie uniquement les postes et catégories de charges expressément mentionnés comme refacturables au locataire
-            2. Liste chacun de ces postes ou catégories, et ne t'arrête pas à une catégorie généraliste comme "charges locatives"
-            3. N'invente aucun poste de charge qui ne serait pas explicitement mentionné
-            4. Si une charge est ambiguë ou implicite, indique-le clairement
-            
-            ## Format attendu (JSON)
-            ```
-            [
-                {{
-                    "categorie": "Catégorie exacte mentionnée dans le bail",
-                    "description": "Description exacte de la charge, telle que rédigée dans le bail",
-                    "base_legale": "Article X.X ou clause Y du bail",
-                    "certitude": "élevée|moyenne|faible"
-                }}
-            ]
-            ```
-            
-            Si aucune charge refacturable n'est mentionnée dans le bail, retourne un tableau vide.
-            """
+            prompt = build_refacturable_charges_prompt(relevant_bail_text)
             
             response_text = send_openai_request(
                 client=client,
@@ -118,18 +156,7 @@ def extract_refacturable_charges_from_bail(bail_text, client):
             )
             
             # Extraire et analyser la réponse JSON
-            result = parse_json_response(response_text, default_value=[])
-            
-            # Vérifier si le résultat est une liste directe ou s'il est encapsulé
-            if isinstance(result, dict) and any(k for k in result.keys() if "charge" in k.lower()):
-                for key in result.keys():
-                    if "charge" in key.lower() and isinstance(result[key], list):
-                        return result[key]
-            elif isinstance(result, list):
-                return result
-            else:
-                # Cas où le format ne correspond pas à ce qui est attendu
-                return []
+            return parse_refacturable_charges(response_text)
     
     except Exception as e:
         st.error(f"Erreur lors de l'extraction des charges refacturables: {str(e)}")
@@ -10,7 +10,8 @@ import numpy as np
 import cv2
 from io import StringIO
 from api.openai_client import send_openai_request, parse_json_response
-from config import MAX_CHARGES_CHARS
+from config import MAX_CHARGES_TOKENS
+from utils.token_trim import trim_to_tokens
 from utils.table_detector import detect_and_extract_tables
 
 def preprocess_charges_text(charges_text):
@@ -177,6 +178,77 @@ def extract_charges_from_table(table_df):
     
     return charges
 
+def build_charged_amounts_prompt(preprocessed_text):
+    """
+    Construit le prompt d'extraction des montants facturés.
+    
+    Args:
+        preprocessed_text: Texte prétraité de la reddition des charges
+        
+    Returns:
+        Prompt à envoyer à l'API
+    """
+    prompt = f"""
+    ## EXTRACTION PRÉCISE DES CHARGES LOCATIVES
+    
+    Le document suivant est un relevé de charges locatives refacturées au preneur.
+    Le document est probablement un tableau formaté sous forme de texte.
+    
+    ```
+    {trim_to_tokens(preprocessed_text, MAX_CHARGES_TOKENS)}
+    ```
+    
+    ## INSTRUCTIONS
+    
+    1. Analyse ce texte pour en extraire les charges facturées.
+    2. Cherche les motifs qui ressemblent à "[NOM DE LA CHARGE] ... [MONTANT]"
+    3. Identifie les informations suivantes:
+       - Le nom exact de la charge (ex: "NETTOYAGE EXTERIEUR")
+       - Le montant facturé HT (si disponible)
+       - Le montant facturé TTC (si disponible)
+    4. Si tu trouves plusieurs montants pour une même charge, prends le montant final ou TTC.
+    5. Identifie également le montant TOTAL des charges.
+    
+    IMPORTANT:
+    - Si tu détectes une structure de tableau, analyse-la ligne par ligne.
+    - Assure-toi d'extraire TOUTES les charges, même avec des descriptions complexes.
+    - CHAQUE LIGNE DE LA PARTIE "charges" DOIT AVOIR un montant numérique valide.
+    - Les montants doivent être des nombres décimaux sans symbole € ou autres caractères.
+    
+    Format précis de la réponse JSON:
+    {{
+        "charges": [
+            {{"poste": "Nom exact du poste", "montant": montant_numérique}},
+            ...
+        ],
+        "total": montant_total_numérique
+    }}
+    """
+    
+    return prompt
+
+def validate_charged_amounts(charges):
+    """
+    Ne conserve que les charges ayant un poste et un montant numérique valide.
+    
+    Args:
+        charges: Liste de charges renvoyée par l'API
+        
+    Returns:
+        Liste de dictionnaires {poste, montant} valides
+    """
+    valid_charges = []
+    for charge in charges:
+        if isinstance(charge, dict) and "poste" in charge and "montant" in charge:
+            try:
+                # S'assurer que le montant est un nombre
+                charge["montant"] = float(charge["montant"])
+                valid_charges.append(charge)
+            except (ValueError, TypeError):
+                continue
+    
+    return valid_charges
+
 def extract_charged_amounts_from_reddition(charges_text, client):
     """
     Version améliorée d'extraction des montants des charges facturées.
@@ -218,42 +290,7 @@ def extract_charged_amounts_from_reddition(charges_text, client):
         return structured_charges
     
     # 4. Si toutes les méthodes échouent, recourir à OpenAI pour l'analyse
-    prompt = f"""
-    ## EXTRACTION PRÉCISE DES CHARGES LOCATIVES
-    
-    Le document suivant est un relevé de charges locatives refacturées au preneur.
-    Le document est probablement un tableau formaté sous forme de texte.
-    
-    ```
-    {preprocessed_text[:MAX_CHARGES_CHARS]}
-    ```
-    
-    ## INSTRUCTIONS
-    
-    1. Analyse ce texte pour en extraire les charges facturées.
-    2. Cherche les motifs qui ressemblent à "[NOM DE LA CHARGE] ... [MONTANT]"
-    3. Identifie les informations suivantes:
-       - Le nom exact de la charge (ex: "NETTOYAGE EXTERIEUR")
-       - Le montant facturé HT (si disponible)
-       - Le montant facturé TTC (si disponible)
-    4. Si tu trouves plusieurs montants pour une même charge, prends le montant final ou TTC.
-    5. Identifie également le montant TOTAL des charges.
-    
-    IMPORTANT:
-    - Si tu détectes une structure de tableau, analyse-la ligne par ligne.
-    - Assure-toi d'extraire TOUTES les charges, même avec des descriptions complexes.
-    - CHAQUE LIGNE DE LA PARTIE "charges" DOIT AVOIR un montant numérique valide.
-    - Les montants doivent être des nombres décimaux sans symbole € ou autres caractères.
-    
-    Format précis de la réponse JSON:
-    {
-        "charges": [
-            {"poste": "Nom exact du poste", "montant": montant_numérique},
-            ...
-        ],
-        "total": montant_total_numérique
-    }
-    """
+    prompt = build_charged_amounts_prompt(preprocessed_text)
     
     response_text = send_openai_request(
         client=client,
@@ -266,15 +303,7 @@ def extract_charged_amounts_from_reddition(charges_text, client):
         
         if "charges" in result and isinstance(result["charges"], list):
             # Vérifier la validité des données
-            valid_charges = []
-            for charge in result["charges"]:
-                if "poste" in charge and "montant" in charge:
-                    try:
-                        # S'assurer que le montant est un nombre
-                        charge["montant"] = float(charge["montant"])
-                        valid_charges.append(charge)
-                    except (ValueError, TypeError):
-                        continue
+            valid_charges = validate_charged_amounts(result["charges"])
             
             if valid_charges:
                 # Afficher un résumé formaté des charges extraites
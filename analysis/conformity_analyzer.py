@@ -3,10 +3,11 @@ Module amélioré d'analyse de la conformité entre les charges refacturables et
 Focus sur la précision et la robustesse de l'analyse juridique.
 """
 import streamlit as st
-import json
 import re
 from api.openai_client import get_openai_client, send_openai_request, parse_json_response
 from config import DEFAULT_CONFORMITY_LEVEL
+from utils.json_utils import dumps as json_dumps
+from analysis.postprocess import compute_charge_totals
 
 def standardize_charge_names(charges):
     """
@@ -177,9 +178,6 @@ def analyse_charges_conformity_local(refacturable_charges, charged_amounts):
         # Trouver les correspondances entre charges refacturables et facturées
         charge_matches = find_similar_charges(refacturable_charges, charged_amounts)
         
-        # Calculer le montant total
-        montant_total = sum(charge.get("montant", 0) for charge in charged_amounts)
-        
         # Analyser chaque charge facturée
         charges_analysees = []
         
@@ -193,14 +191,10 @@ def analyse_charges_conformity_local(refacturable_charges, charged_amounts):
             # Évaluer la conformité
             evaluation = evaluate_charge_conformity(charge, matches)
             
-            # Calculer le pourcentage
-            pourcentage = (charge.get("montant", 0) / montant_total * 100) if montant_total > 0 else 0
-            
             # Créer l'entrée d'analyse
             charge_analysee = {
                 "poste": charge.get("poste", ""),
                 "montant": charge.get("montant", 0),
-                "pourcentage": pourcentage,
                 "conformite": evaluation["conformite"],
                 "justification": evaluation["justification"],
                 "contestable": evaluation["contestable"],
@@ -209,6 +203,10 @@ def analyse_charges_conformity_local(refacturable_charges, charged_amounts):
             
             charges_analysees.append(charge_analysee)
         
+        # Montant total et pourcentages calculés en un seul passage
+        resultat = compute_charge_totals({"charges_facturees": charges_analysees})
+        montant_total = resultat["montant_total"]
+        
         # Calculer le taux global de conformité
         charges_conformes = [c for c in charges_analysees if c["conformite"] == "conforme"]
         montant_conforme = sum(c["montant"] for c in charges_conformes)
@@ -241,10 +239,8 @@ def analyse_charges_conformity_local(refacturable_charges, charged_amounts):
             )
         
         # Constituer le résultat final
-        resultat = {
+        resultat.update({
             "charges_refacturables": refacturable_charges,
-            "charges_facturees": charges_analysees,
-            "montant_total": montant_total,
             "analyse_globale": {
                 "taux_conformite": round(taux_conformite),
                 "conformite_detail": (
@@ -255,7 +251,7 @@ def analyse_charges_conformity_local(refacturable_charges, charged_amounts):
                 )
             },
             "recommandations": recommandations
-        }
+        })
         
         return resultat
     
@@ -287,8 +283,8 @@ def analyse_charges_conformity(refacturable_charges, charged_amounts, client):
                 
             # Sinon, recourir à l'IA
             # Convertir les listes en JSON pour les inclure dans le prompt
-            refacturable_json = json.dumps(refacturable_charges, ensure_ascii=False)
-            charged_json = json.dumps(charged_amounts, ensure_ascii=False)
+            refacturable_json = json_dumps(refacturable_charges)
+            charged_json = json_dumps(charged_amounts)
             
             prompt = f"""
             ## Tâche d'analyse
@@ -312,9 +308,7 @@ def analyse_charges_conformity(refacturable_charges, charged_amounts, client):
             1. Pour chaque charge facturée, détermine si elle correspond à une charge refacturable expressément prévue par le bail
             2. Évalue la conformité de chaque charge par rapport au bail
             3. Identifie les charges potentiellement contestables qui ne sont pas susceptibles d'être refacturée au preneur avec une justification précise
-            4. Calcule le pourcentage que représente chaque charge par rapport au total des charges facturées
-            5. Calcule le montant total des charges facturées
-            6. Détermine un taux global de conformité basé sur le pourcentage des charges conformes
+            4. Détermine un taux global de conformité basé sur le pourcentage des charges conformes
             
             ## Format attendu (JSON)
             ```json
@@ -323,14 +317,12 @@ def analyse_charges_conformity(refacturable_charges, charged_amounts, client):
                     {{
                         "poste": "Intitulé exact de la charge facturée",
                         "montant": 1234.56,
-                        "pourcentage": 25.5,
                         "conformite": "conforme|à vérifier|non conforme",
                         "justification": "Explication précise de la conformité ou non",
                         "contestable": true|false,
                         "raison_contestation": "Raison précise si contestable"
                     }}
                 ],
-                "montant_total": 5000.00,
                 "analyse_globale": {{
                     "taux_conformite": 75,
                     "conformite_detail": "Explication détaillée du taux de conformité"
@@ -354,32 +346,30 @@ def analyse_charges_conformity(refacturable_charges, charged_amounts, client):
             # Ajouter les charges refacturables au résultat pour l'affichage complet
             if result:
                 result["charges_refacturables"] = refacturable_charges
-                return result
+                return compute_charge_totals(result)
             else:
                 # En cas d'échec du parsing, retourner une structure minimale
-                return {
+                return compute_charge_totals({
                     "charges_refacturables": refacturable_charges,
                     "charges_facturees": charged_amounts,
-                    "montant_total": sum(charge.get("montant", 0) for charge in charged_amounts),
                     "analyse_globale": {
                         "taux_conformite": DEFAULT_CONFORMITY_LEVEL,
                         "conformite_detail": "Impossible d'analyser la conformité en raison d'une erreur."
                     },
                     "recommandations": ["Vérifier manuellement la conformité des charges."]
-                }
+                })
     
     except Exception as e:
         st.error(f"Erreur lors de l'analyse de conformité: {str(e)}")
-        return {
+        return compute_charge_totals({
             "charges_refacturables": refacturable_charges,
             "charges_facturees": charged_amounts,
-            "montant_total": sum(charge.get("montant", 0) for charge in charged_amounts),
             "analyse_globale": {
                 "taux_conformite": DEFAULT_CONFORMITY_LEVEL,
                 "conformite_detail": "Impossible d'analyser la conformité en raison d'une erreur."
             },
             "recommandations": ["Vérifier manuellement la conformité des charges."]
-        }
+        })
 
 def retry_analyse_conformity(refacturable_charges, charged_amounts, client):
     """
@@ -395,8 +385,8 @@ def retry_analyse_conformity(refacturable_charges, charged_amounts, client):
     """
     try:
         # Convertir les listes en JSON pour les inclure dans le prompt
-        refacturable_json = json.dumps(refacturable_charges, ensure_ascii=False)
-        charged_json = json.dumps(charged_amounts, ensure_ascii=False)
+        refacturable_json = json_dumps(refacturable_charges)
+        charged_json = json_dumps(charged_amounts)
         
         prompt = f"""
         ## ANALYSE SIMPLIFIÉE DE CONFORMITÉ DES CHARGES
@@ -424,13 +414,11 @@ def retry_analyse_conformity(refacturable_charges, charged_amounts, client):
             {{
               "poste": "...",
               "montant": X.XX,
-              "pourcentage": XX.X,
               "conformite": "conforme|à vérifier|non conforme",
               "contestable": true|false,
               "raison_contestation": "..."
             }}
           ],
-          "montant_total": XXX.XX,
           "analyse_globale": {{
             "taux_conformite": XX,
             "conformite_detail": "..."
@@ -450,7 +438,7 @@ def retry_analyse_conformity(refacturable_charges, charged_amounts, client):
         # Ajouter les charges refacturables au résultat
         if result:
             result["charges_refacturables"] = refacturable_charges
-            return result
+            return compute_charge_totals(result)
         else:
             return None
     
@@ -498,9 +486,8 @@ def final_attempt_complete_analysis(text1, text2, client):
             {{ "categorie": "...", "description": "...", "base_legale": "...", "certitude": "..." }}
           ],
           "charges_facturees": [
-            {{ "poste": "...", "montant": X.XX, "pourcentage": XX.X, "conformite": "...", "contestable": true|false, "raison_contestation": "..." }}
+            {{ "poste": "...", "montant": X.XX, "conformite": "...", "contestable": true|false, "raison_contestation": "..." }}
           ],
-          "montant_total": XXX.XX,
           "analyse_globale": {{ "taux_conformite": XX, "conformite_detail": "..." }},
           "recommandations": ["..."]
         }}
@@ -517,7 +504,7 @@ def final_attempt_complete_analysis(text1, text2, client):
         
         # Vérifier la validité du résultat
         if result and "charges_facturees" in result and "analyse_globale" in result:
-            return result
+            return compute_charge_totals(result)
         else:
             # Structure minimale en cas d'échec
             return {
@@ -0,0 +1,54 @@
+"""
+Calculs dérivés des charges facturées (montant total, pourcentages), effectués localement
+plutôt que demandés au modèle.
+"""
+import numpy as np
+
+def _to_amount(value):
+    """
+    Convertit un montant en flottant, 0 si la valeur n'est pas numérique.
+
+    Args:
+        value: Montant tel que renvoyé par l'analyse
+
+    Returns:
+        Le montant en flottant
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+def compute_charge_totals(analysis):
+    """
+    Calcule en un seul passage le montant total et le pourcentage de chaque charge facturée.
+    Le dictionnaire d'analyse est modifié sur place.
+
+    Args:
+        analysis: Dictionnaire d'analyse contenant "charges_facturees"
+
+    Returns:
+        Le dictionnaire d'analyse complété
+    """
+    if not isinstance(analysis, dict):
+        return analysis
+
+    charges = analysis.get("charges_facturees")
+    if not isinstance(charges, list):
+        charges = []
+    charges = [charge for charge in charges if isinstance(charge, dict)]
+
+    montants = np.fromiter((_to_amount(charge.get("montant", 0)) for charge in charges), dtype=np.float64, count=len(charges))
+    total = montants.sum()
+
+    if total > 0:
+        pourcentages = (montants / total * 100.0).tolist()
+    else:
+        pourcentages = [0.0] * len(charges)
+
+    for charge, montant, pourcentage in zip(charges, montants.tolist(), pourcentages):
+        charge["montant"] = montant
+        charge["pourcentage"] = pourcentage
+
+    analysis["montant_total"] = float(total)
+    return analysis
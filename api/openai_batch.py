@@ -0,0 +1,122 @@
+"""
+Module de gestion de l'API Batch d'OpenAI pour les analyses non interactives.
+Les requêtes traitées en lot sont facturées moitié prix, avec un délai de traitement maximal de 24h.
+"""
+import streamlit as st
+from api.openai_client import build_chat_request_body, get_http_session
+from utils.json_utils import loads as json_loads, dumps as json_dumps
+
+OPENAI_FILES_URL = "https://api.openai.com/v1/files"
+OPENAI_BATCHES_URL = "https://api.openai.com/v1/batches"
+CHAT_COMPLETIONS_ENDPOINT = "/v1/chat/completions"
+
+def submit_batch(client, prompts):
+    """
+    Soumet un lot de prompts à l'API Batch d'OpenAI.
+
+    Args:
+        client: Dictionnaire contenant la clé API
+        prompts: Liste de dictionnaires {"custom_id": ..., "prompt": ..., "temperature": ..., "json_format": ...}
+
+    Returns:
+        Identifiant du lot créé, ou None en cas d'erreur
+    """
+    try:
+        session = get_http_session(client.get("api_key"))
+
+        # Une ligne JSONL par requête de chat completion
+        lines = []
+        for item in prompts:
+            body = build_chat_request_body(
+                item["prompt"],
+                temperature=item.get("temperature", 0.1),
+                json_format=item.get("json_format", True),
+                max_tokens=item.get("max_tokens")
+            )
+            lines.append(json_dumps({
+                "custom_id": str(item["custom_id"]),
+                "method": "POST",
+                "url": CHAT_COMPLETIONS_ENDPOINT,
+                "body": body
+            }))
+
+        # Téléversement du fichier de requêtes
+        upload_response = session.post(
+            OPENAI_FILES_URL,
+            data={"purpose": "batch"},
+            files={"file": ("batch.jsonl", "\n".join(lines).encode("utf-8"), "application/jsonl")}
+        )
+
+        if upload_response.status_code != 200:
+            st.error(f"Erreur lors du téléversement du lot ({upload_response.status_code}): {upload_response.text}")
+            return None
+
+        # Création du lot
+        batch_response = session.post(
+            OPENAI_BATCHES_URL,
+            json={
+                "input_file_id": upload_response.json()["id"],
+                "endpoint": CHAT_COMPLETIONS_ENDPOINT,
+                "completion_window": "24h"
+            }
+        )
+
+        if batch_response.status_code != 200:
+            st.error(f"Erreur lors de la création du lot ({batch_response.status_code}): {batch_response.text}")
+            return None
+
+        return batch_response.json()["id"]
+
+    except Exception as e:
+        st.error(f"Erreur lors de la soumission du lot: {str(e)}")
+        return None
+
+def poll_batch(client, batch_id):
+    """
+    Vérifie l'état d'un lot et récupère ses réponses s'il est terminé.
+
+    Args:
+        client: Dictionnaire contenant la clé API
+        batch_id: Identifiant du lot
+
+    Returns:
+        Tuple (statut du lot, dictionnaire {custom_id: contenu de la réponse} ou None si le lot n'est pas terminé)
+    """
+    try:
+        session = get_http_session(client.get("api_key"))
+
+        response = session.get(f"{OPENAI_BATCHES_URL}/{batch_id}")
+        if response.status_code != 200:
+            st.error(f"Erreur lors de la vérification du lot ({response.status_code}): {response.text}")
+            return "error", None
+
+        batch = response.json()
+        status = batch.get("status", "unknown")
+
+        if status != "completed" or not batch.get("output_file_id"):
+            return status, None
+
+        # Téléchargement du fichier de sortie
+        output_response = session.get(f"{OPENAI_FILES_URL}/{batch['output_file_id']}/content")
+        if output_response.status_code != 200:
+            st.error(f"Erreur lors du téléchargement des résultats ({output_response.status_code}): {output_response.text}")
+            return "error", None
+
+        results = {}
+        for line in output_response.text.splitlines():
+            if not line.strip():
+                continue
+
+            entry = json_loads(line)
+            entry_response = entry.get("response") or {}
+
+            if entry_response.get("status_code") == 200:
+                results[entry["custom_id"]] = entry_response["body"]["choices"][0]["message"]["content"]
+            else:
+                st.warning(f"Requête {entry.get('custom_id')} du lot en échec: {entry.get('error')}")
+
+        return status, results
+
+    except Exception as e:
+        st.error(f"Erreur lors de la récupération du lot: {str(e)}")
+        return "error", None
@@ -2,10 +2,32 @@
 Module de gestion de l'API OpenAI pour l'analyse des charges locatives.
 """
 import streamlit as st
-import json
+import re
+import hashlib
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
 import requests
+from requests.adapters import HTTPAdapter
+from utils.json_utils import loads as json_loads, dumps_bytes, JSON_DECODE_ERRORS
+from utils.cache_utils import UncachedResult
 from config import get_openai_api_key, DEFAULT_MODEL, FALLBACK_MODEL
 
+OPENAI_CHAT_URL = "https://api.openai.com/v1/chat/completions"
+# Délais maximaux d'une requête à l'API (connexion, lecture), en secondes. En flux, le délai
+# de lecture s'applique entre deux fragments de la réponse
+OPENAI_TIMEOUT = (5, 60)
+# Attente maximale du résultat d'une requête identique déjà en cours, en secondes
+# (requête principale puis modèle de secours)
+INFLIGHT_WAIT_TIMEOUT = 300
+
+# Mention du format JSON dans un prompt, exigée par l'API avec response_format json_object
+_JSON_RE = re.compile(r"\bjson\b", re.IGNORECASE)
+
+# Requêtes en cours, indexées par l'empreinte de leur corps: les appels identiques
+# simultanés (reruns, tentatives de reprise) partagent une seule requête HTTP
+_inflight = {}
+_inflight_lock = threading.Lock()
+
 def get_openai_client():
     """Vérifie simplement que la clé API est disponible."""
     try:
@@ -18,6 +40,56 @@ def get_openai_client():
         st.error(f"Erreur lors de la vérification de la clé API: {str(e)}")
         raise
 
+@st.cache_resource
+def get_http_session(api_key):
+    """
+    Crée une session HTTP persistante, partagée entre les reruns Streamlit.
+    La réutilisation des connexions (keep-alive) évite une poignée de main TCP+TLS par requête.
+    
+    Args:
+        api_key: Clé API OpenAI
+        
+    Returns:
+        Session requests authentifiée
+    """
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(pool_connections=16, pool_maxsize=16))
+    # Content-Type est positionné par requests via le paramètre json=
+    session.headers.update({"Authorization": f"Bearer {api_key}"})
+    return session
+
+def build_chat_request_body(prompt, model=DEFAULT_MODEL, temperature=0.1, json_format=True, max_tokens=None):
+    """
+    Construit le corps d'une requête de chat completion.
+    
+    Args:
+        prompt: Le prompt à envoyer à l'API
+        model: Modèle à utiliser
+        temperature: Paramètre de température (0.0-1.0)
+        json_format: Booléen indiquant si la réponse doit être au format JSON
+        max_tokens: Nombre maximum de tokens pour la réponse
+        
+    Returns:
+        Dictionnaire prêt à être sérialisé en JSON
+    """
+    # Ajouter "json" au prompt si json_format est demandé mais que "json" n'est pas déjà dans le prompt
+    if json_format and not _JSON_RE.search(prompt):
+        prompt += "\n\nRéponds sous forme de JSON."
+    
+    data = {
+        "model": model,
+        "messages": [{"role": "user", "content": prompt}],
+        "temperature": temperature
+    }
+    
+    if json_format:
+        data["response_format"] = {"type": "json_object"}
+    
+    if max_tokens:
+        data["max_tokens"] = max_tokens
+    
+    return data
+
 def send_openai_request(client, prompt, model=DEFAULT_MODEL, temperature=0.1, json_format=True, max_tokens=None):
     """
     Envoie une requête à l'API OpenAI en utilisant directement requests.
@@ -33,53 +105,89 @@ def send_openai_request(client, prompt, model=DEFAULT_MODEL, temperature=0.1, js
     Returns:
         La réponse de l'API OpenAI, ou None en cas d'erreur
     """
+    data = build_chat_request_body(prompt, model, temperature, json_format, max_tokens)
+    key = hashlib.sha256(
+        client.get("api_key", "").encode("utf-8") + b"\x00" + dumps_bytes(data, sort_keys=True)
+    ).hexdigest()
+    
+    with _inflight_lock:
+        future = _inflight.get(key)
+        is_owner = future is None
+        if is_owner:
+            future = Future()
+            _inflight[key] = future
+    
+    # Une requête identique est déjà en cours: attendre son résultat
+    if not is_owner:
+        try:
+            return future.result(timeout=INFLIGHT_WAIT_TIMEOUT)
+        except FutureTimeoutError:
+            st.error("Délai dépassé en attendant la réponse de l'API OpenAI")
+            return None
+    
+    content = None
     try:
-        api_key = client.get("api_key")
-        
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {api_key}"
-        }
-        
-        # Ajouter "json" au prompt si json_format est demandé mais que "json" n'est pas déjà dans le prompt
-        if json_format and "json" not in prompt.lower():
-            prompt += "\n\nRéponds sous forme de JSON."
+        content = _cached_chat_completion(key, client, data)
+    except UncachedResult as e:
+        content = e.value
+    finally:
+        with _inflight_lock:
+            del _inflight[key]
+        future.set_result(content)
+    
+    return content
+
+@st.cache_data(show_spinner=False, ttl=24 * 3600, max_entries=256)
+def _cached_chat_completion(key, _client, _data):
+    """
+    Envoie la requête à l'API, avec mise en cache de la réponse. La clé intègre la clé API:
+    un changement de compte ne réutilise pas les réponses obtenues avec un autre.
+    Une réponse vide (erreur) est renvoyée sans être mise en cache.
+    
+    Args:
+        key: Empreinte de la clé API et du corps de la requête (clé de cache)
+        _client: Dictionnaire contenant la clé API
+        _data: Corps de la requête construit par build_chat_request_body
         
-        data = {
-            "model": model,
-            "messages": [{"role": "user", "content": prompt}],
-            "temperature": temperature
-        }
+    Returns:
+        Le contenu de la réponse
+    """
+    content = _post_chat_completion(_client, _data)
+    if not content:
+        raise UncachedResult(content)
+    return content
+
+def _post_chat_completion(client, data):
+    """
+    Envoie le corps de requête à l'API, avec tentative sur le modèle de secours.
+    
+    Args:
+        client: Dictionnaire contenant la clé API
+        data: Corps de la requête construit par build_chat_request_body
         
-        if json_format:
-            data["response_format"] = {"type": "json_object"}
+    Returns:
+        Le contenu de la réponse, ou None en cas d'erreur
+    """
+    try:
+        session = get_http_session(client.get("api_key"))
         
-        if max_tokens:
-            data["max_tokens"] = max_tokens
-            
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
-            headers=headers,
-            json=data
-        )
+        # Réponse en flux (SSE) pour suivre la progression sans attendre le corps complet
+        data = dict(data, stream=True)
+        response = session.post(OPENAI_CHAT_URL, json=data, stream=True, timeout=OPENAI_TIMEOUT)
         
         if response.status_code == 200:
-            return response.json()["choices"][0]["message"]["content"]
+            return read_streamed_content(response)
         else:
             st.error(f"Erreur API ({response.status_code}): {response.text}")
             
             # Tentative avec modèle de secours si différent du modèle actuel
-            if model != FALLBACK_MODEL:
+            if data["model"] != FALLBACK_MODEL:
                 st.info(f"Tentative avec le modèle de secours {FALLBACK_MODEL}...")
-                data["model"] = FALLBACK_MODEL
-                fallback_response = requests.post(
-                    "https://api.openai.com/v1/chat/completions",
-                    headers=headers,
-                    json=data
-                )
+                data = dict(data, model=FALLBACK_MODEL)
+                fallback_response = session.post(OPENAI_CHAT_URL, json=data, stream=True, timeout=OPENAI_TIMEOUT)
                 
                 if fallback_response.status_code == 200:
-                    return fallback_response.json()["choices"][0]["message"]["content"]
+                    return read_streamed_content(fallback_response)
                 else:
                     st.error(f"Erreur avec le modèle de secours ({fallback_response.status_code}): {fallback_response.text}")
             
@@ -89,6 +197,38 @@ def send_openai_request(client, prompt, model=DEFAULT_MODEL, temperature=0.1, js
         st.error(f"Erreur lors de la requête API: {str(e)}")
         return None
 
+def read_streamed_content(response):
+    """
+    Assemble le contenu d'une réponse en flux (Server-Sent Events) au fil de sa réception.
+    
+    Args:
+        response: Réponse requests ouverte avec stream=True
+        
+    Returns:
+        Le contenu complet de la réponse
+    """
+    placeholder = st.empty()
+    buffer = []
+    received = 0
+    
+    for line in response.iter_lines():
+        if not line.startswith(b"data: "):
+            continue
+        
+        payload = line[6:]
+        if payload == b"[DONE]":
+            break
+        
+        choices = json_loads(payload).get("choices") or [{}]
+        piece = choices[0].get("delta", {}).get("content")
+        if piece:
+            buffer.append(piece)
+            received += len(piece)
+            placeholder.caption(f"Réception de la réponse... {received} caractères")
+    
+    placeholder.empty()
+    return "".join(buffer)
+
 def parse_json_response(response_text, default_value=None):
     """
     Parse une réponse JSON de l'API OpenAI et gère les erreurs de parsing.
@@ -104,9 +244,9 @@ def parse_json_response(response_text, default_value=None):
         return default_value
         
     try:
-        result = json.loads(response_text)
+        result = json_loads(response_text)
         return result
-    except json.JSONDecodeError as e:
+    except JSON_DECODE_ERRORS as e:
         st.warning(f"Erreur lors du parsing JSON: {str(e)}")
         st.code(response_text[:500] + "..." if len(response_text) > 500 else response_text)
         return default_value
@@ -3,24 +3,74 @@ Module d'intégration des améliorations pour l'analyseur de charges locatives c
 """
 import streamlit as st
 import os
-import tempfile
 import io
-import numpy as np
-import cv2
+import pandas as pd
 from PIL import Image
 from api.openai_client import get_openai_client
 from utils.file_utils import process_multiple_files
+from utils.ocr_utils import process_file_with_fallback
+from utils.cache_utils import content_digest, UncachedResult
+from utils.concurrency import run_in_threads, first_matching_result, cancellation_requested
+from utils.table_detector import detect_and_extract_tables
+from utils.json_utils import dumps_bytes
+from analysis import analyze_batch, fetch_batch_extractions
+from analysis.bail_analyzer import extract_refacturable_charges_from_bail, retry_extract_refacturable_charges
+from analysis.charges_analyzer import extract_charged_amounts_from_reddition, extract_charged_amounts_fallback
+from analysis.local_bail_analyzer import extract_refacturable_charges_locally, extract_charged_amounts_locally
+from analysis.conformity_analyzer import analyse_charges_conformity, analyse_charges_conformity_local
+from analysis.postprocess import compute_charge_totals
+from ui.visualizations import render_plot_png
+from config import DEFAULT_CONFORMITY_LEVEL
 
-def analyze_commercial_lease_charges(bail_files, charges_files):
+def analyze_commercial_lease_charges(bail_files, charges_files, mode="interactive"):
     """
     Fonction principale améliorée d'analyse des charges locatives commerciales.
+    Pour des fichiers identiques à une analyse précédente, l'extraction de texte, la détection
+    des tableaux et les réponses de l'API sont reprises du cache; les étapes et leurs messages
+    sont affichés à chaque exécution.
     
     Args:
         bail_files: Fichiers du bail commercial
         charges_files: Fichiers de la reddition des charges
+        mode: "interactive" pour une analyse immédiate, "batch" pour soumettre
+            les requêtes à l'API Batch d'OpenAI (coût réduit de moitié, résultats sous 24h)
         
     Returns:
-        Résultat de l'analyse
+        Résultat de l'analyse (None en mode "batch", les résultats étant récupérés ultérieurement)
+    """
+    return run_analysis_pipeline(bail_files, charges_files, mode)
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def detect_tables_cached(image_digest, text_digest, _image_data, _charges_text):
+    """
+    Détecte et extrait les tableaux d'une image, avec mise en cache selon le contenu.
+    
+    Args:
+        image_digest: Empreinte de l'image (clé de cache)
+        text_digest: Empreinte du texte des charges (clé de cache)
+        _image_data: Données binaires de l'image
+        _charges_text: Texte de la reddition des charges
+        
+    Returns:
+        Liste des charges extraites des tableaux
+    """
+    result = detect_and_extract_tables(_charges_text, _image_data)
+    # Extraction interrompue en cours de route: résultat partiel, à ne pas mettre en cache
+    if cancellation_requested():
+        raise UncachedResult(result)
+    return result
+
+def run_analysis_pipeline(bail_files, charges_files, mode="interactive"):
+    """
+    Enchaîne les étapes d'extraction, d'identification des charges et d'analyse de conformité.
+    
+    Args:
+        bail_files: Fichiers du bail commercial
+        charges_files: Fichiers de la reddition des charges
+        mode: "interactive" ou "batch"
+        
+    Returns:
+        Résultat de l'analyse, ou None
     """
     st.write("### Processus d'analyse amélioré")
     
@@ -39,41 +89,38 @@ def analyze_commercial_lease_charges(bail_files, charges_files):
     
     # Étape 1: Extraction du texte des fichiers avec OCR amélioré
     with st.spinner("Étape 1/3: Extraction du texte des documents..."):
-        from utils.ocr_utils import process_file_with_fallback
+        def extract_file(file):
+            # Contenu lu sans copie; les extractions coûteuses (OCR) sont mises en cache
+            # selon l'empreinte du contenu par les extracteurs eux-mêmes
+            try:
+                file_bytes = file.getbuffer()
+                file_content = process_file_with_fallback(io.BytesIO(file_bytes), file.type, file.name)
+                return file_bytes, file_content
+            except Exception as e:
+                st.warning(f"Erreur lors du traitement du fichier {file.name}: {str(e)}")
+                return None, ""
         
-        # Traitement du bail avec OCR amélioré
-        bail_text = ""
-        for file in bail_files:
+        # Traitement concurrent de tous les fichiers (l'OCR natif libère le GIL)
+        for file in bail_files + charges_files:
             st.info(f"Traitement du fichier: {file.name}")
-            file_content = process_file_with_fallback(file)
-            if file_content:
-                bail_text += f"\n\n--- Début du fichier: {file.name} ---\n\n"
-                bail_text += file_content
-                bail_text += f"\n\n--- Fin du fichier: {file.name} ---\n\n"
+        results = run_in_threads(extract_file, bail_files + charges_files)
+        bail_results = results[:len(bail_files)]
+        charges_results = results[len(bail_files):]
         
-        # Traitement des charges avec OCR amélioré
-        charges_text = ""
-        charges_images = []  # Pour l'extraction de tableaux
+        # Assemblage du bail, dans l'ordre des fichiers (les fichiers vides sont ignorés)
+        bail_text = "".join(
+            f"\n\n--- Début du fichier: {file.name} ---\n\n{file_content}\n\n--- Fin du fichier: {file.name} ---\n\n"
+            for file, (file_bytes, file_content) in zip(bail_files, bail_results)
+            if file_content
+        )
         
-        for file in charges_files:
-            st.info(f"Traitement du fichier: {file.name}")
-            file.seek(0)
-            
-            try:
-                # Sauvegarder l'image en mémoire pour traitement ultérieur
-                file_bytes = file.getvalue()
-                charges_images.append(file_bytes)
-                
-                # Réessayer l'OCR sur le fichier
-                file.seek(0)
-                file_content = process_file_with_fallback(file)
-                
-                if file_content:
-                    charges_text += f"\n\n--- Début du fichier: {file.name} ---\n\n"
-                    charges_text += file_content
-                    charges_text += f"\n\n--- Fin du fichier: {file.name} ---\n\n"
-            except Exception as e:
-                st.warning(f"Erreur lors du traitement du fichier {file.name}: {str(e)}")
+        # Assemblage des charges, en conservant le contenu pour l'extraction de tableaux
+        charges_text = "".join(
+            f"\n\n--- Début du fichier: {file.name} ---\n\n{file_content}\n\n--- Fin du fichier: {file.name} ---\n\n"
+            for file, (file_bytes, file_content) in zip(charges_files, charges_results)
+            if file_content
+        )
+        charges_images = [file_bytes for file_bytes, file_content in charges_results if file_bytes is not None]
     
     if not bail_text or len(bail_text.strip()) < 100:
         st.error("❌ Impossible d'extraire suffisamment de texte du bail. Vérifiez vos fichiers.")
@@ -82,10 +129,13 @@ def analyze_commercial_lease_charges(bail_files, charges_files):
     if not charges_text or len(charges_text.strip()) < 100:
         st.warning("⚠️ Extraction de texte limitée pour les charges. L'analyse pourrait être incomplète.")
     
+    # Mode différé: les extractions sont soumises à l'API Batch et récupérées plus tard
+    if mode == "batch":
+        submit_batch_analysis(bail_text, charges_text, client)
+        return None
+    
     # Étape 2: Extraction des charges refacturables du bail
     with st.spinner("Étape 2/3: Extraction des charges refacturables du bail..."):
-        from analysis.bail_analyzer import extract_refacturable_charges_from_bail, retry_extract_refacturable_charges
-        
         # Tentative d'extraction avec ou sans OpenAI
         refacturable_charges = None
         
@@ -98,7 +148,6 @@ def analyze_commercial_lease_charges(bail_files, charges_files):
         
         # Si pas de résultat avec OpenAI ou pas de client, utiliser l'analyse locale
         if not refacturable_charges:
-            from analysis.local_bail_analyzer import extract_refacturable_charges_locally
             refacturable_charges = extract_refacturable_charges_locally(bail_text)
         
         if refacturable_charges:
@@ -109,40 +158,31 @@ def analyze_commercial_lease_charges(bail_files, charges_files):
     
     # Étape 3: Extraction des montants facturés
     with st.spinner("Étape 3/3: Extraction des montants facturés..."):
-        from analysis.charges_analyzer import extract_charged_amounts_from_reddition, extract_charged_amounts_fallback
-        from utils.table_detector import detect_and_extract_tables
+        # Tentative d'extraction de tableaux à partir des images, en parallèle:
+        # le premier résultat exploitable (au moins 3 charges identifiées) est retenu
+        text_digest = content_digest(charges_text.encode("utf-8"))
         
-        # Tentative d'extraction de tableaux à partir des images
-        charged_amounts = None
-        
-        # Modification de l'approche de traitement des images
-        for image_data in charges_images:
+        def extract_tables(image_data):
+            try:
+                # Vérification de l'en-tête uniquement, sans décoder l'image
+                Image.open(io.BytesIO(image_data))
+            except Exception:
+                st.warning("Image non valide pour la détection de tableaux")
+                return None
+            
             try:
-                # Convertir les données binaires en image OpenCV pour debug
-                nparr = np.frombuffer(image_data, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-                if img is None:
-                    st.warning("Image non valide pour la détection de tableaux")
-                    continue
-                    
-                # Enregistrer temporairement l'image pour pouvoir la traiter
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp:
-                    cv2.imwrite(tmp.name, img)
-                    
-                # Utiliser l'image sauvegardée pour l'extraction de tableaux
-                with open(tmp.name, 'rb') as f:
-                    safe_image_data = f.read()
-                    table_charges = detect_and_extract_tables(charges_text, safe_image_data)
-                    
-                # Nettoyer le fichier temporaire
-                os.unlink(tmp.name)
-                
-                if table_charges and len(table_charges) >= 3:  # Au moins 3 charges identifiées
-                    charged_amounts = table_charges
-                    break
+                return detect_tables_cached(content_digest(image_data), text_digest, image_data, charges_text)
+            except UncachedResult as e:
+                return e.value
             except Exception as e:
                 st.warning(f"Erreur lors de l'extraction des tableaux: {str(e)}")
+                return None
+        
+        charged_amounts = first_matching_result(
+            extract_tables,
+            charges_images,
+            lambda table_charges: bool(table_charges) and len(table_charges) >= 3
+        )
         
         # Si pas de résultat avec l'extraction de tableaux, utiliser l'API
         if not charged_amounts and client:
@@ -155,7 +195,6 @@ def analyze_commercial_lease_charges(bail_files, charges_files):
         
         # Si toujours rien, utiliser l'extraction locale (sans IA)
         if not charged_amounts:
-            from analysis.local_bail_analyzer import extract_charged_amounts_locally
             charged_amounts = extract_charged_amounts_locally(charges_text)
         
         if charged_amounts:
@@ -167,44 +206,123 @@ def analyze_commercial_lease_charges(bail_files, charges_files):
     
     # Étape 4: Analyse de la conformité
     with st.spinner("Étape 4/3: Analyse de la conformité..."):
-        from analysis.conformity_analyzer import analyse_charges_conformity, analyse_charges_conformity_local
-        
-        result = None
-        
-        # D'abord essayer l'analyse locale
-        try:
-            result = analyse_charges_conformity_local(refacturable_charges, charged_amounts)
-        except Exception as e:
-            st.warning(f"Analyse locale non réussie: {str(e)}")
-        
-        # Si pas de résultat local et client disponible, utiliser l'API
-        if not result and client:
-            result = analyse_charges_conformity(refacturable_charges, charged_amounts, client)
+        result = run_conformity_analysis(refacturable_charges, charged_amounts, client)
+    
+    return result
+
+def run_conformity_analysis(refacturable_charges, charged_amounts, client):
+    """
+    Analyse la conformité des charges facturées, localement puis via l'API si nécessaire.
+    
+    Args:
+        refacturable_charges: Liste des charges refacturables selon le bail
+        charged_amounts: Liste des charges facturées
+        client: Client OpenAI (ou None)
         
-        # Si toujours pas de résultat, utiliser une structure minimale
-        if not result:
-            from config import DEFAULT_CONFORMITY_LEVEL
-            result = {
-                "charges_refacturables": refacturable_charges,
-                "charges_facturees": charged_amounts,
-                "montant_total": sum(charge.get("montant", 0) for charge in charged_amounts),
-                "analyse_globale": {
-                    "taux_conformite": DEFAULT_CONFORMITY_LEVEL,
-                    "conformite_detail": "Analyse automatique limitée. Vérification manuelle recommandée."
-                },
-                "recommandations": [
-                    "Vérifier manuellement la conformité de chaque poste de charge.",
-                    "Consulter un expert pour une analyse complète."
-                ]
-            }
+    Returns:
+        Résultat de l'analyse
+    """
+    result = None
+    
+    # D'abord essayer l'analyse locale
+    try:
+        result = analyse_charges_conformity_local(refacturable_charges, charged_amounts)
+    except Exception as e:
+        st.warning(f"Analyse locale non réussie: {str(e)}")
+    
+    # Si pas de résultat local et client disponible, utiliser l'API
+    if not result and client:
+        result = analyse_charges_conformity(refacturable_charges, charged_amounts, client)
+    
+    # Si toujours pas de résultat, utiliser une structure minimale
+    if not result:
+        result = compute_charge_totals({
+            "charges_refacturables": refacturable_charges,
+            "charges_facturees": charged_amounts,
+            "analyse_globale": {
+                "taux_conformite": DEFAULT_CONFORMITY_LEVEL,
+                "conformite_detail": "Analyse automatique limitée. Vérification manuelle recommandée."
+            },
+            "recommandations": [
+                "Vérifier manuellement la conformité de chaque poste de charge.",
+                "Consulter un expert pour une analyse complète."
+            ]
+        })
+    
+    if "analyse_globale" in result and "taux_conformite" in result["analyse_globale"]:
+        conformity = result["analyse_globale"]["taux_conformite"]
+        st.success(f"✅ Analyse complète avec un taux de conformité de {conformity}%")
+    else:
+        st.warning("⚠️ Analyse de conformité limitée.")
+    
+    return result
+
+def submit_batch_analysis(bail_text, charges_text, client):
+    """
+    Soumet l'extraction des charges du bail et de la reddition à l'API Batch d'OpenAI.
+    
+    Args:
+        bail_text: Texte du bail commercial
+        charges_text: Texte de la reddition des charges
+        client: Client OpenAI
         
-        if "analyse_globale" in result and "taux_conformite" in result["analyse_globale"]:
-            conformity = result["analyse_globale"]["taux_conformite"]
-            st.success(f"✅ Analyse complète avec un taux de conformité de {conformity}%")
+    Returns:
+        Identifiant du lot soumis, ou None en cas d'échec
+    """
+    if not client:
+        st.error("❌ Le traitement différé nécessite une clé API OpenAI valide.")
+        return None
+    
+    jobs = [{"doc_id": "analyse", "text1": bail_text, "text2": charges_text}]
+    batch_id = analyze_batch(jobs, client)
+    
+    if batch_id:
+        # Conserver le lot et les textes pour la récupération des résultats
+        st.session_state.batch_id = batch_id
+        st.session_state.batch_jobs = jobs
+        st.success(f"✅ Analyse soumise en traitement différé (lot {batch_id}). Les résultats seront disponibles sous 24h.")
+    
+    return batch_id
+
+def retrieve_batch_analysis():
+    """
+    Récupère et termine une analyse soumise en traitement différé.
+    
+    Returns:
+        Résultat de l'analyse, ou None si le lot n'est pas encore terminé
+    """
+    batch_id = st.session_state.get("batch_id")
+    if not batch_id:
+        return None
+    
+    try:
+        client = get_openai_client()
+    except Exception as e:
+        st.error(f"Erreur lors de l'initialisation du client OpenAI: {str(e)}")
+        return None
+    
+    jobs = st.session_state.batch_jobs
+    status, extractions = fetch_batch_extractions(batch_id, jobs, client)
+    
+    if extractions is None:
+        if status in ("failed", "expired", "cancelled"):
+            st.error(f"❌ Le traitement différé n'a pas abouti (statut: {status}). Relancez l'analyse.")
+            del st.session_state.batch_id
         else:
-            st.warning("⚠️ Analyse de conformité limitée.")
+            st.info(f"Traitement différé en cours (statut: {status}). Réessayez plus tard.")
+        return None
     
-    return result
+    refacturable_charges, charged_amounts = extractions["analyse"]
+    
+    del st.session_state.batch_id
+    del st.session_state.batch_jobs
+    
+    if not refacturable_charges or not charged_amounts:
+        st.error("❌ Le traitement différé n'a pas permis d'identifier les charges.")
+        return None
+    
+    with st.spinner("Analyse de la conformité..."):
+        return run_conformity_analysis(refacturable_charges, charged_amounts, client)
 
 def integrate_improved_modules():
     """
@@ -266,153 +384,117 @@ def main():
             key="charges_upload"
         )
     
+    # Mode de traitement
+    deferred = st.checkbox(
+        "Traitement différé (API Batch: coût réduit de moitié, résultats sous 24h)",
+        key="batch_mode"
+    )
+    
+    result = None
+    
     # Bouton d'analyse
     if st.button("Analyser les charges", type="primary"):
         if bail_files and charges_files:
-            result = analyze_commercial_lease_charges(bail_files, charges_files)
-            
-            if result:
-                # Afficher les résultats
-                st.header("Résultats de l'analyse")
-                
-                # Métriques principales
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("Montant total des charges", f"{result['montant_total']:.2f}€")
-                with col2:
-                    st.metric("Taux de conformité", f"{result['analyse_globale']['taux_conformite']}%")
-                
-                # Analyse globale
-                st.subheader("Analyse globale")
-                st.info(result["analyse_globale"]["conformite_detail"])
-                
-                # Charges refacturables
-                st.subheader("Charges refacturables selon le bail")
-                if result["charges_refacturables"]:
-                    import pandas as pd
-                    refac_df = pd.DataFrame([
-                        {
-                            "Catégorie": charge.get("categorie", ""),
-                            "Description": charge.get("description", ""),
-                            "Base légale": charge.get("base_legale", "")
-                        }
-                        for charge in result["charges_refacturables"]
-                    ])
-                    st.dataframe(refac_df)
-                else:
-                    st.warning("Aucune information sur les charges refacturables.")
-                
-                # Charges facturées
-                st.subheader("Charges facturées")
-                if result["charges_facturees"]:
-                    import pandas as pd
-                    charges_df = pd.DataFrame([
-                        {
-                            "Poste": charge["poste"],
-                            "Montant (€)": f"{charge['montant']:.2f}",
-                            "% du total": f"{charge['pourcentage']:.1f}%",
-                            "Conformité": charge["conformite"],
-                            "Contestable": "Oui" if charge.get("contestable", False) else "Non"
-                        }
-                        for charge in result["charges_facturees"]
-                    ])
-                    st.dataframe(charges_df)
-                    
-                    # Visualisation graphique
-                    st.subheader("Répartition des charges")
-                    try:
-                        import matplotlib.pyplot as plt
-                        import numpy as np
-                        
-                        # Préparation des données pour le camembert
-                        labels = []
-                        sizes = []
-                        colors = []
-                        explode = []
-                        
-                        # Palette de couleurs selon la conformité
-                        color_map = {
-                            "conforme": "green",
-                            "à vérifier": "orange",
-                            "non conforme": "red"
-                        }
-                        
-                        for charge in result["charges_facturees"]:
-                            if charge["montant"] > 0:
-                                labels.append(charge["poste"])
-                                sizes.append(charge["montant"])
-                                colors.append(color_map.get(charge["conformite"], "grey"))
-                                explode.append(0.1 if charge.get("contestable", False) else 0)
-                        
-                        fig, ax = plt.subplots(figsize=(10, 8))
-                        wedges, texts, autotexts = ax.pie(
-                            sizes, 
-                            labels=labels, 
-                            autopct='%1.1f%%',
-                            explode=explode,
-                            colors=colors,
-                            startangle=90
-                        )
-                        
-                        # Ajuster l'apparence
-                        plt.setp(autotexts, size=8, weight='bold')
-                        plt.setp(texts, size=8)
-                        ax.axis('equal')
-                        
-                        plt.title('Répartition des charges locatives commerciales')
-                        
-                        # Légende pour les couleurs
-                        legend_elements = [
-                            plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='green', markersize=10, label='Conforme'),
-                            plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='orange', markersize=10, label='À vérifier'),
-                            plt.Line2D([0], [0], marker='o', color='w', markerfacecolor='red', markersize=10, label='Non conforme')
-                        ]
-                        ax.legend(handles=legend_elements, loc='upper right')
-                        
-                        st.pyplot(fig)
-                    except Exception as e:
-                        st.error(f"Erreur lors de la création du graphique: {str(e)}")
-                
-                # Charges contestables
-                st.subheader("Charges potentiellement contestables")
-                contestable_charges = [c for c in result["charges_facturees"] if c.get("contestable", False)]
-                if contestable_charges:
-                    for i, charge in enumerate(contestable_charges):
-                        with st.expander(f"{i+1}. {charge['poste']} ({charge['montant']:.2f}€)"):
-                            st.markdown(f"**Montant:** {charge['montant']:.2f}€ ({charge['pourcentage']:.1f}% du total)")
-                            st.markdown(f"**Raison:** {charge.get('raison_contestation', 'Non spécifiée')}")
-                            st.markdown(f"**Justification:** {charge.get('justification', '')}")
-                else:
-                    st.success("Aucune charge contestable n'a été identifiée.")
-                
-                # Recommandations
-                st.subheader("Recommandations")
-                if "recommandations" in result and result["recommandations"]:
-                    for i, rec in enumerate(result["recommandations"]):
-                        st.markdown(f"{i+1}. {rec}")
-                else:
-                    st.info("Aucune recommandation spécifique.")
-                
-                # Export des résultats
-                st.subheader("Exporter les résultats")
-                col1, col2 = st.columns(2)
-                
-                with col1:
-                    # Export JSON
-                    import json
-                    json_str = json.dumps(result, indent=2, ensure_ascii=False)
-                    st.download_button(
-                        label="Télécharger l'analyse (JSON)",
-                        data=json_str.encode('utf-8'),
-                        file_name="analyse_charges_locatives.json",
-                        mime="application/json"
-                    )
-                
-                with col2:
-                    # Export PDF (fonctionnalité à implémenter séparément)
-                    st.button("Télécharger le rapport PDF", disabled=True)
+            result = analyze_commercial_lease_charges(
+                bail_files,
+                charges_files,
+                mode="batch" if deferred else "interactive"
+            )
         else:
             st.error("Veuillez télécharger les fichiers du bail et de la reddition des charges.")
+    
+    # Récupération d'une analyse soumise en traitement différé
+    if st.session_state.get("batch_id"):
+        if st.button("Récupérer les résultats du traitement différé"):
+            result = retrieve_batch_analysis()
+    
+    if result:
+        # Afficher les résultats
+        st.header("Résultats de l'analyse")
+        
+        # Métriques principales
+        col1, col2 = st.columns(2)
+        with col1:
+            st.metric("Montant total des charges", f"{result['montant_total']:.2f}€")
+        with col2:
+            st.metric("Taux de conformité", f"{result['analyse_globale']['taux_conformite']}%")
+        
+        # Analyse globale
+        st.subheader("Analyse globale")
+        st.info(result["analyse_globale"]["conformite_detail"])
+        
+        # Charges refacturables
+        st.subheader("Charges refacturables selon le bail")
+        if result["charges_refacturables"]:
+            refacturables = result["charges_refacturables"]
+            refac_df = pd.DataFrame({
+                "Catégorie": [charge.get("categorie", "") for charge in refacturables],
+                "Description": [charge.get("description", "") for charge in refacturables],
+                "Base légale": [charge.get("base_legale", "") for charge in refacturables]
+            })
+            st.dataframe(refac_df)
+        else:
+            st.warning("Aucune information sur les charges refacturables.")
+        
+        # Charges facturées
+        st.subheader("Charges facturées")
+        if result["charges_facturees"]:
+            charges = result["charges_facturees"]
+            charges_df = pd.DataFrame({
+                "Poste": [charge["poste"] for charge in charges],
+                "Montant (€)": [f"{charge['montant']:.2f}" for charge in charges],
+                "% du total": [f"{charge['pourcentage']:.1f}%" for charge in charges],
+                "Conformité": [charge["conformite"] for charge in charges],
+                "Contestable": ["Oui" if charge.get("contestable", False) else "Non" for charge in charges]
+            })
+            st.dataframe(charges_df)
+            
+            # Visualisation graphique
+            st.subheader("Répartition des charges")
+            try:
+                # Camembert mis en cache selon les charges affichées
+                png = render_plot_png("charges_pie", result["charges_facturees"])
+                if png:
+                    st.image(png)
+            except Exception as e:
+                st.error(f"Erreur lors de la création du graphique: {str(e)}")
+        
+        # Charges contestables
+        st.subheader("Charges potentiellement contestables")
+        contestable_charges = [c for c in result["charges_facturees"] if c.get("contestable", False)]
+        if contestable_charges:
+            for i, charge in enumerate(contestable_charges):
+                with st.expander(f"{i+1}. {charge['poste']} ({charge['montant']:.2f}€)"):
+                    st.markdown(f"**Montant:** {charge['montant']:.2f}€ ({charge['pourcentage']:.1f}% du total)")
+                    st.markdown(f"**Raison:** {charge.get('raison_contestation', 'Non spécifiée')}")
+                    st.markdown(f"**Justification:** {charge.get('justification', '')}")
+        else:
+            st.success("Aucune charge contestable n'a été identifiée.")
+        
+        # Recommandations
+        st.subheader("Recommandations")
+        if "recommandations" in result and result["recommandations"]:
+            for i, rec in enumerate(result["recommandations"]):
+                st.markdown(f"{i+1}. {rec}")
+        else:
+            st.info("Aucune recommandation spécifique.")
+        
+        # Export des résultats
+        st.subheader("Exporter les résultats")
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            # Export JSON
+            st.download_button(
+                label="Télécharger l'analyse (JSON)",
+                data=dumps_bytes(result, indent=True),
+                file_name="analyse_charges_locatives.json",
+                mime="application/json"
+            )
+        
+        with col2:
+            # Export PDF (fonctionnalité à implémenter séparément)
+            st.button("Télécharger le rapport PDF", disabled=True)
 
 
 if __name__ == "__main__":
@@ -2,8 +2,21 @@
 Configuration globale de l'application d'analyse de charges locatives commerciales.
 """
 import os
+import functools
 import streamlit as st
 
+__all__ = [
+    "configure_page",
+    "initialize_session_state",
+    "get_openai_api_key",
+    "get_ocr_api_key",
+    "DEFAULT_MODEL",
+    "FALLBACK_MODEL",
+    "MAX_BAIL_TOKENS",
+    "MAX_CHARGES_TOKENS",
+    "DEFAULT_CONFORMITY_LEVEL",
+]
+
 # Configuration de la page Streamlit
 def configure_page():
     """Configure les paramètres de la page Streamlit."""
@@ -16,10 +29,10 @@ def configure_page():
 # Initialisation de l'état de la session
 def initialize_session_state():
     """Initialise les variables d'état de la session Streamlit."""
-    if 'analysis_complete' not in st.session_state:
-        st.session_state.analysis_complete = False
+    st.session_state.setdefault('analysis_complete', False)
 
 # Configuration de l'API OpenAI
+@functools.lru_cache(maxsize=None)
 def get_openai_api_key():
     """Récupère la clé API OpenAI depuis les secrets ou variables d'environnement."""
     api_key = st.secrets["OPENAI_API_KEY"] if "OPENAI_API_KEY" in st.secrets else os.getenv('OPENAI_API_KEY')
@@ -28,6 +41,7 @@ def get_openai_api_key():
     return api_key
 
 # Configuration de l'API OCR.space
+@functools.lru_cache(maxsize=None)
 def get_ocr_api_key():
     """Récupère la clé API OCR.space depuis les secrets ou variables d'environnement."""
     api_key = st.secrets["OCR_API_KEY"] if "OCR_API_KEY" in st.secrets else os.getenv('OCR_API_KEY')
@@ -40,9 +54,9 @@ def get_ocr_api_key():
 DEFAULT_MODEL = "gpt-4o-mini"
 FALLBACK_MODEL = "gpt-4o-mini"  # Modèle de secours en cas d'erreur
 
-# Limites de caractères pour les prompts
-MAX_BAIL_CHARS = 15000
-MAX_CHARGES_CHARS = 10000
+# Budgets de tokens pour les textes inclus dans les prompts
+MAX_BAIL_TOKENS = 6000
+MAX_CHARGES_TOKENS = 4000
 
 # Constantes d'analyse
 DEFAULT_CONFORMITY_LEVEL = 50  # Niveau de conformité par défaut
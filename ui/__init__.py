@@ -1,4 +1,14 @@
 """
 Module de gestion de l'interface utilisateur de l'application.
 """
+import importlib
 
+# Sous-modules chargés à la demande, au premier accès (ex: ui.results)
+_LAZY_SUBMODULES = {"tabs", "results", "visualizations"}
+
+def __getattr__(name):
+    if name in _LAZY_SUBMODULES:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -2,10 +2,9 @@
 Module pour l'affichage des résultats de l'analyse.
 """
 import streamlit as st
-import pandas as pd
-import matplotlib.pyplot as plt
-from utils.export_utils import export_to_json, generate_pdf_report
+from utils.streamlit_utils import fragment
 
+@fragment
 def display_results(analysis, document_type):
     """
     Affiche les résultats de l'analyse sous forme structurée.
@@ -15,6 +14,10 @@ def display_results(analysis, document_type):
         document_type: Type de document (commercial)
     """
     st.header("Résultats de l'analyse des charges locatives commerciales")
+    
+    globale = analysis.get("analyse_globale") or {}
+    refacturables = analysis.get("charges_refacturables") or []
+    charges = analysis.get("charges_facturees") or []
 
     # Afficher le montant total et la conformité globale
     col1, col2 = st.columns(2)
@@ -22,59 +25,59 @@ def display_results(analysis, document_type):
         if "montant_total" in analysis:
             st.metric("Montant total des charges", f"{analysis['montant_total']:.2f}€")
     with col2:
-        if "analyse_globale" in analysis and "taux_conformite" in analysis["analyse_globale"]:
-            st.metric("Taux de conformité", f"{analysis['analyse_globale']['taux_conformite']}%")
+        if "taux_conformite" in globale:
+            st.metric("Taux de conformité", f"{globale['taux_conformite']}%")
     
     # Détail de l'analyse de conformité
-    if "analyse_globale" in analysis and "conformite_detail" in analysis["analyse_globale"]:
+    if "conformite_detail" in globale:
         st.markdown("### Analyse de conformité")
-        st.info(analysis["analyse_globale"]["conformite_detail"])
+        st.info(globale["conformite_detail"])
 
     # Section 1: Charges refacturables selon le bail
     st.markdown("## Charges refacturables selon le bail")
-    if "charges_refacturables" in analysis and analysis["charges_refacturables"]:
-        # Créer un DataFrame restructuré pour un meilleur affichage
-        refined_data = []
-        for charge in analysis["charges_refacturables"]:
-            refined_data.append({
-                "Catégorie": charge.get("categorie", ""),
-                "Description": charge.get("description", ""),
-                "Base légale": charge.get("base_legale", ""),
-                "Certitude": charge.get("certitude", "")
-            })
-        
-        refacturables_df = pd.DataFrame(refined_data)
-        st.dataframe(refacturables_df, use_container_width=True)
+    if refacturables:
+        # Tableau restructuré pour un meilleur affichage (construit par colonnes,
+        # transmis directement à st.dataframe sans DataFrame intermédiaire)
+        refacturables_table = {
+            "Catégorie": [charge.get("categorie", "") for charge in refacturables],
+            "Description": [charge.get("description", "") for charge in refacturables],
+            "Base légale": [charge.get("base_legale", "") for charge in refacturables],
+            "Certitude": [charge.get("certitude", "") for charge in refacturables]
+        }
+        st.dataframe(refacturables_table, use_container_width=True)
     else:
         st.warning("Aucune information sur les charges refacturables n'a été identifiée dans le bail.")
 
+    # Un seul parcours des charges facturées pour le tableau, le graphique et les charges contestables
+    charges_table = {"Poste": [], "Montant (€)": [], "% du total": [], "Conformité": [], "Contestable": []}
+    positive_charges = []
+    contestable_charges = []
+    for charge in charges:
+        contestable = charge.get("contestable", False)
+        charges_table["Poste"].append(charge["poste"])
+        charges_table["Montant (€)"].append(charge["montant"])
+        charges_table["% du total"].append(f"{charge['pourcentage']:.1f}%")
+        charges_table["Conformité"].append(charge["conformite"])
+        charges_table["Contestable"].append("Oui" if contestable else "Non")
+        if charge["montant"] > 0:
+            positive_charges.append(charge)
+        if contestable:
+            contestable_charges.append(charge)
+
     # Section 2: Charges effectivement facturées
     st.markdown("## Charges facturées")
-    if "charges_facturees" in analysis and analysis["charges_facturees"]:
-        # Préparation des données pour le tableau
-        charges_df = pd.DataFrame([
-            {
-                "Poste": charge["poste"],
-                "Montant (€)": charge["montant"],
-                "% du total": f"{charge['pourcentage']:.1f}%",
-                "Conformité": charge["conformite"],
-                "Contestable": "Oui" if charge.get("contestable", False) else "Non"
-            }
-            for charge in analysis["charges_facturees"]
-        ])
-        
+    if charges:
         # Affichage du tableau
-        st.dataframe(charges_df, use_container_width=True)
+        st.dataframe(charges_table, use_container_width=True)
         
-        # Préparation et affichage du graphique camembert avec la fonction de visualizations.py
-        display_charges_chart(analysis["charges_facturees"])
+        # Affichage du graphique de répartition
+        display_charges_chart(positive_charges)
     else:
         st.warning("Aucune charge facturée n'a été identifiée.")
 
     # Section 3: Charges contestables
     st.markdown("## Charges potentiellement contestables")
     if "charges_facturees" in analysis:
-        contestable_charges = [c for c in analysis["charges_facturees"] if c.get("contestable")]
         if contestable_charges:
             for charge in contestable_charges:
                 with st.expander(f"{charge['poste']} ({charge['montant']}€)"):
@@ -97,7 +100,8 @@ def display_results(analysis, document_type):
 
 def display_charges_chart(charges_facturees):
     """
-    Affiche un graphique camembert des charges facturées.
+    Affiche la répartition des charges facturées sous forme de diagramme en barres,
+    rendu côté navigateur.
     
     Args:
         charges_facturees: Liste des charges facturées
@@ -106,43 +110,22 @@ def display_charges_chart(charges_facturees):
     if not charges_facturees:
         st.warning("Aucune charge à afficher dans le graphique.")
         return
-        
-    # Préparation du graphique camembert
-    fig, ax = plt.subplots(figsize=(10, 6))
-    
-    # S'assurer que toutes les valeurs sont positives
-    labels = []
-    sizes = []
     
+    # Ne prendre que les montants positifs pour le graphique
+    chart_data = {"Poste": [], "Montant (€)": []}
     for charge in charges_facturees:
-        # Ne prendre que les montants positifs pour le graphique
         montant = charge.get("montant", 0)
-        if montant > 0:  # Ne prendre que les valeurs positives
-            labels.append(charge.get("poste", ""))
-            sizes.append(montant)
+        if montant > 0:
+            chart_data["Poste"].append(charge.get("poste", ""))
+            chart_data["Montant (€)"].append(montant)
     
     # Vérifier s'il reste des valeurs à afficher
-    if not sizes:
+    if not chart_data["Montant (€)"]:
         st.warning("Aucune charge avec un montant positif à afficher.")
         return
     
-    # Génération du graphique
-    wedges, texts, autotexts = ax.pie(
-        sizes, 
-        labels=labels, 
-        autopct='%1.1f%%',
-        textprops={'fontsize': 9},
-        startangle=90
-    )
-    
-    # Ajustements du graphique
-    plt.setp(autotexts, size=9, weight='bold')
-    plt.setp(texts, size=9)
-    ax.axis('equal')  # Equal aspect ratio ensures the pie chart is circular
-    plt.title('Répartition des charges locatives commerciales')
-    
-    # Affichage du graphique
-    st.pyplot(fig)
+    st.markdown("**Répartition des charges locatives commerciales**")
+    st.bar_chart(chart_data, x="Poste", y="Montant (€)")
 
 def display_export_options(analysis, document_type):
     """
@@ -156,8 +139,14 @@ def display_export_options(analysis, document_type):
     col1, col2 = st.columns(2)
     
     with col1:
-        # Export JSON
-        json_data = export_to_json(analysis)
+        # Export JSON, sérialisé une seule fois par analyse affichée
+        cached_export = st.session_state.get("_json_export")
+        if cached_export and cached_export[0] is analysis:
+            json_data = cached_export[1]
+        else:
+            from utils.export_utils import export_to_json
+            json_data = export_to_json(analysis)
+            st.session_state["_json_export"] = (analysis, json_data)
         st.download_button(
             label="Télécharger l'analyse en JSON",
             data=json_data,
@@ -168,6 +157,8 @@ def display_export_options(analysis, document_type):
     with col2:
         # Export PDF
         try:
+            from utils.export_utils import generate_pdf_report
+            
             document1_text = st.session_state.get('document1_text', '')
             document2_text = st.session_state.get('document2_text', '')
             
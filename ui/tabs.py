@@ -1,8 +1,28 @@
 """
 Module pour la gestion des onglets et de la barre latérale de l'application Streamlit.
 """
+import re
 import streamlit as st
 from utils.file_utils import process_multiple_files, validate_file_input
+from utils.streamlit_utils import fragment
+
+# Surface saisie: entier ou décimal (séparateur point ou virgule)
+_SURFACE_RE = re.compile(r"^\s*(\d+(?:[.,]\d+)?)\s*$")
+
+# Longueur de l'aperçu du texte extrait
+PREVIEW_CHARS = 1000
+
+def _make_preview(text):
+    """
+    Construit l'aperçu d'un texte extrait.
+    
+    Args:
+        text: Texte extrait
+        
+    Returns:
+        Les premiers caractères du texte, suivis de "..." s'il est tronqué
+    """
+    return text[:PREVIEW_CHARS] + "..." if len(text) > PREVIEW_CHARS else text
 
 def render_sidebar():
     """
@@ -18,50 +38,69 @@ def render_sidebar():
     
     st.sidebar.info("Cet outil est conçu spécifiquement pour analyser les baux commerciaux et leurs charges.")
     
+    # Surface et métriques dans un fragment: modifier la surface ne réexécute que ce bloc
+    with st.sidebar:
+        _sidebar_metrics()
+    
+    # Traitement différé via l'API Batch d'OpenAI
+    st.sidebar.checkbox(
+        "Traitement différé (−50% coût)",
+        key="batch_mode",
+        help="Les analyses sont soumises à l'API Batch d'OpenAI: coût réduit de moitié, résultats sous 24h"
+    )
+    
+    # Ajout d'informations complémentaires
+    with st.sidebar.expander("À propos de l'outil"):
+        st.write("""
+        Cet outil utilise l'intelligence artificielle pour analyser la conformité
+        des charges locatives commerciales par rapport au bail.
+        
+        Il est conçu pour vous aider à identifier rapidement les charges potentiellement
+        contestables et à préparer vos discussions avec le bailleur.
+        
+        Les résultats sont fournis à titre indicatif et ne constituent pas un avis juridique.
+        """)
+    
+    return document_type, st.session_state.get("surface", "")
+
+@fragment
+def _sidebar_metrics():
+    """
+    Affiche la saisie de la surface locative et les métriques de l'analyse terminée.
+    Doit être appelée dans le contexte de la barre latérale (with st.sidebar).
+    """
     # Entrée de la surface locative
-    surface = st.sidebar.text_input(
+    surface = st.text_input(
         "Surface locative (m²)",
+        key="surface",
         help="Utilisé pour calculer le ratio de charges au m²"
     )
     
-    # Ajout de métriques dans la sidebar si l'analyse est complète
+    # Ajout de métriques si l'analyse est complète
     if st.session_state.get('analysis_complete', False):
         analysis = st.session_state.get('analysis', {})
         
         if "montant_total" in analysis:
-            st.sidebar.metric(
+            st.metric(
                 "Montant total des charges", 
                 f"{analysis['montant_total']:.2f}€"
             )
             
             # Calculer et afficher le ratio au m² si la surface est définie
-            if surface and surface.isdigit() and int(surface) > 0:
-                ratio = analysis['montant_total'] / int(surface)
-                st.sidebar.metric(
+            surface_match = _SURFACE_RE.match(surface or "")
+            surface_value = float(surface_match.group(1).replace(",", ".")) if surface_match else None
+            if surface_value and surface_value > 0:
+                ratio = analysis['montant_total'] / surface_value
+                st.metric(
                     "Ratio charges/m²", 
                     f"{ratio:.2f}€/m²"
                 )
         
         if "analyse_globale" in analysis and "taux_conformite" in analysis["analyse_globale"]:
-            st.sidebar.metric(
+            st.metric(
                 "Taux de conformité", 
                 f"{analysis['analyse_globale']['taux_conformite']}%"
             )
-    
-    # Ajout d'informations complémentaires
-    with st.sidebar.expander("À propos de l'outil"):
-        st.write("""
-        Cet outil utilise l'intelligence artificielle pour analyser la conformité
-        des charges locatives commerciales par rapport au bail.
-        
-        Il est conçu pour vous aider à identifier rapidement les charges potentiellement
-        contestables et à préparer vos discussions avec le bailleur.
-        
-        Les résultats sont fournis à titre indicatif et ne constituent pas un avis juridique.
-        """)
-    
-    return document_type, surface
-
 
 def render_input_tabs():
     """
@@ -105,7 +144,7 @@ def render_input_tabs():
             if document1_text:
                 st.success(f"✅ {len(doc1_files)} fichier(s) traité(s) - {len(document1_text)} caractères extraits")
                 with st.expander("Aperçu du texte extrait"):
-                    st.text(document1_text[:1000] + "..." if len(document1_text) > 1000 else document1_text)
+                    st.text(_make_preview(document1_text))
             else:
                 st.error("❌ Aucun texte n'a pu être extrait. Vérifiez vos fichiers.")
     
@@ -128,7 +167,7 @@ def render_input_tabs():
             if document2_text:
                 st.success(f"✅ {len(doc2_files)} fichier(s) traité(s) - {len(document2_text)} caractères extraits")
                 with st.expander("Aperçu du texte extrait"):
-                    st.text(document2_text[:1000] + "..." if len(document2_text) > 1000 else document2_text)
+                    st.text(_make_preview(document2_text))
             else:
                 st.error("❌ Aucun texte n'a pu être extrait. Vérifiez vos fichiers.")
     
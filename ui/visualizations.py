@@ -1,9 +1,41 @@
 """
 Module pour la création de graphiques et visualisations.
 """
+import io
+from collections import Counter
 import streamlit as st
-import matplotlib.pyplot as plt
+import matplotlib
 import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.colors import ListedColormap
+from matplotlib.figure import Figure
+from matplotlib.lines import Line2D
+from matplotlib.patches import Circle
+
+# Rendu sans interface graphique (Streamlit) et réglages allégeant le tracé des textes et des chemins
+matplotlib.use('Agg')
+matplotlib.rcParams.update({
+    'path.simplify': True,
+    'path.simplify_threshold': 1.0,
+    'text.hinting': 'none',
+    'text.hinting_factor': 8,
+    'agg.path.chunksize': 10000,
+})
+
+def _new_figure(figsize):
+    """
+    Crée une figure hors de pyplot: elle n'est pas conservée par le gestionnaire global
+    de figures et est libérée dès qu'elle n'est plus référencée.
+    
+    Args:
+        figsize: Dimensions de la figure (largeur, hauteur)
+        
+    Returns:
+        La figure, associée à un canevas Agg
+    """
+    fig = Figure(figsize=figsize)
+    FigureCanvasAgg(fig)
+    return fig
 
 def plot_themes_chart(themes):
     """
@@ -23,7 +55,8 @@ def plot_themes_chart(themes):
     sizes = [1] * len(themes)
 
     # Graphique camembert
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig = _new_figure((10, 6))
+    ax = fig.subplots()
     wedges, texts, autotexts = ax.pie(
         sizes, 
         labels=labels, 
@@ -32,11 +65,13 @@ def plot_themes_chart(themes):
     )
 
     # Ajuster les propriétés du texte
-    plt.setp(autotexts, size=8, weight='bold')
-    plt.setp(texts, size=8)
+    for autotext in autotexts:
+        autotext.set(size=8, weight='bold')
+    for text in texts:
+        text.set(size=8)
 
-    plt.title('Thèmes principaux identifiés')
-    plt.tight_layout()
+    ax.set_title('Thèmes principaux identifiés')
+    fig.tight_layout()
     
     return fig
 
@@ -54,39 +89,37 @@ def plot_conformity_gauge(conformity_level):
     conformity_level = max(0, min(100, conformity_level))
     
     # Créer la figure et les axes
-    fig, ax = plt.subplots(figsize=(10, 5), subplot_kw={'projection': 'polar'})
+    fig = _new_figure((10, 5))
+    ax = fig.subplots(subplot_kw={'projection': 'polar'})
     
     # Paramètres de la jauge
-    theta = np.linspace(0, np.pi, 100)
     r = 1.0  # Rayon fixe
     
-    # Créer les segments de la jauge
+    # Créer les segments de la jauge en un seul maillage (une couleur par segment)
     segments = 5
     width = np.pi / segments
     colors = ['#FF6B6B', '#FFD166', '#06D6A0', '#118AB2', '#073B4C']
-    
-    for i in range(segments):
-        start_angle = i * width
-        end_angle = (i + 1) * width
-        segment_theta = np.linspace(start_angle, end_angle, 20)
-        ax.fill_between(segment_theta, 0, r, color=colors[i], alpha=0.8)
+    theta_edges = np.linspace(0, np.pi, segments + 1)
+    r_edges = np.array([0, r])
+    ax.pcolormesh(
+        theta_edges, r_edges, np.arange(segments).reshape(1, -1),
+        cmap=ListedColormap(colors), vmin=0, vmax=segments - 1, alpha=0.8, shading='flat'
+    )
     
     # Calculer la position de l'aiguille
     needle_angle = conformity_level / 100 * np.pi
     ax.plot([0, needle_angle], [0, 0.8], 'k-', linewidth=3)
     
     # Ajouter un cercle à la base de l'aiguille
-    ax.add_patch(plt.Circle((0, 0), 0.1, color='k', zorder=10))
+    ax.add_patch(Circle((0, 0), 0.1, color='k', zorder=10))
     
     # Personnaliser l'apparence du graphique
     ax.set_axis_off()  # Masquer les axes
     
     # Ajouter des étiquettes pour les niveaux
     labels = ['Faible', 'Moyen', 'Bon', 'Très bon', 'Excellent']
-    for i, label in enumerate(labels):
-        angle = (i + 0.5) * width
-        x = 1.2 * np.cos(angle)
-        y = 1.2 * np.sin(angle)
+    angles = (np.arange(segments) + 0.5) * width
+    for angle, label in zip(angles, labels):
         ax.text(angle, 1.2, label, ha='center', va='center', fontsize=9)
     
     # Ajouter la valeur numérique au centre
@@ -108,29 +141,30 @@ def plot_charges_distribution(charges_facturees):
         return None
         
     # Extraire les données
-    labels = [charge["poste"] for charge in charges_facturees]
-    values = [charge["montant"] for charge in charges_facturees]
+    values = np.fromiter((charge["montant"] for charge in charges_facturees), dtype=np.float64, count=len(charges_facturees))
+    labels = np.array([charge["poste"] for charge in charges_facturees], dtype=object)
     
     # Trier par montant (du plus grand au plus petit)
-    sorted_indices = np.argsort(values)[::-1]
-    labels = [labels[i] for i in sorted_indices]
-    values = [values[i] for i in sorted_indices]
+    order = np.argsort(-values, kind="stable")
+    values = values[order]
+    labels = labels[order]
     
     # Limiter à 10 catégories pour la lisibilité
     if len(labels) > 10:
-        labels = labels[:9] + ["Autres"]
-        values = values[:9] + [sum(values[9:])]
+        labels = np.append(labels[:9], "Autres")
+        values = np.append(values[:9], values[9:].sum())
     
     # Créer le graphique
-    fig, ax = plt.subplots(figsize=(10, 6))
+    fig = _new_figure((10, 6))
+    ax = fig.subplots()
     
     # Définir une palette de couleurs
-    cmap = plt.cm.Blues
+    cmap = matplotlib.colormaps['Blues']
     colors = cmap(np.linspace(0.4, 0.8, len(labels)))
     
     # Créer les barres horizontales
     y_pos = range(len(labels))
-    ax.barh(y_pos, values, color=colors)
+    bars = ax.barh(y_pos, values, color=colors)
     
     # Personnaliser l'apparence
     ax.set_yticks(y_pos)
@@ -140,10 +174,9 @@ def plot_charges_distribution(charges_facturees):
     ax.set_title('Distribution des charges locatives')
     
     # Ajouter les valeurs sur les barres
-    for i, v in enumerate(values):
-        ax.text(v + max(values) * 0.01, i, f'{v:.2f} €', va='center')
+    ax.bar_label(bars, labels=[f'{v:.2f} €' for v in values], padding=3)
     
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
 
 def plot_conformity_by_category(charges_facturees):
@@ -160,15 +193,14 @@ def plot_conformity_by_category(charges_facturees):
         return None
         
     # Compter les charges par statut de conformité
-    conformity_status = {}
-    for charge in charges_facturees:
-        status = charge.get("conformite", "à vérifier")
-        if status not in conformity_status:
-            conformity_status[status] = 0
-        conformity_status[status] += 1
+    # (dans l'ordre de première apparition; statut absent ou vide: "à vérifier")
+    status_counts = Counter(charge.get("conformite") or "à vérifier" for charge in charges_facturees)
+    labels = list(status_counts)
+    counts = list(status_counts.values())
     
     # Créer le graphique
-    fig, ax = plt.subplots(figsize=(8, 5))
+    fig = _new_figure((8, 5))
+    ax = fig.subplots()
     
     # Définir les couleurs par statut
     colors = {
@@ -178,8 +210,6 @@ def plot_conformity_by_category(charges_facturees):
     }
     
     # Créer le graphique en barres
-    labels = list(conformity_status.keys())
-    counts = list(conformity_status.values())
     bar_colors = [colors.get(status, "#CCCCCC") for status in labels]
     
     bars = ax.bar(labels, counts, color=bar_colors)
@@ -189,10 +219,133 @@ def plot_conformity_by_category(charges_facturees):
     ax.set_title('Répartition des charges par statut de conformité')
     
     # Ajouter les valeurs sur les barres
-    for bar in bars:
-        height = bar.get_height()
-        ax.text(bar.get_x() + bar.get_width()/2., height + 0.1,
-                f'{height:.0f}', ha='center', va='bottom')
+    ax.bar_label(bars, fmt='%d', padding=3)
     
-    plt.tight_layout()
+    fig.tight_layout()
     return fig
+
+# Couleurs des postes selon leur conformité
+_CONFORMITY_COLORS = {
+    "conforme": "green",
+    "à vérifier": "orange",
+    "non conforme": "red"
+}
+
+def plot_charges_pie(charges_facturees):
+    """
+    Crée un camembert de la répartition des charges facturées de montant positif,
+    coloré selon la conformité, les charges contestables étant détachées.
+    
+    Args:
+        charges_facturees: Liste des charges facturées
+        
+    Returns:
+        Figure matplotlib du graphique, ou None s'il n'y a rien à afficher
+    """
+    charges = [charge for charge in charges_facturees or [] if charge["montant"] > 0]
+    if not charges:
+        return None
+    
+    sizes = np.fromiter((charge["montant"] for charge in charges), dtype=np.float64, count=len(charges))
+    labels = [charge["poste"] for charge in charges]
+    colors = [_CONFORMITY_COLORS.get(charge["conformite"], "grey") for charge in charges]
+    explode = [0.1 if charge["contestable"] else 0.0 for charge in charges]
+    
+    fig = _new_figure((10, 8))
+    ax = fig.subplots()
+    wedges, texts, autotexts = ax.pie(
+        sizes,
+        labels=labels,
+        autopct='%1.1f%%',
+        explode=explode,
+        colors=colors,
+        startangle=90
+    )
+    
+    # Ajuster l'apparence
+    for autotext in autotexts:
+        autotext.set_fontsize(8)
+        autotext.set_fontweight('bold')
+    for text in texts:
+        text.set_fontsize(8)
+    ax.axis('equal')
+    
+    ax.set_title('Répartition des charges locatives commerciales')
+    
+    # Légende pour les couleurs
+    legend_elements = [
+        Line2D([0], [0], marker='o', color='w', markerfacecolor='green', markersize=10, label='Conforme'),
+        Line2D([0], [0], marker='o', color='w', markerfacecolor='orange', markersize=10, label='À vérifier'),
+        Line2D([0], [0], marker='o', color='w', markerfacecolor='red', markersize=10, label='Non conforme')
+    ]
+    ax.legend(handles=legend_elements, loc='upper right')
+    
+    return fig
+
+# Champs des charges facturées utilisés par les graphiques
+_CHARGE_FIELDS = ("poste", "montant", "conformite", "contestable")
+
+# Graphiques disponibles pour render_plot_png, et indicateur "prend une liste de charges"
+_PLOT_FUNCTIONS = {
+    "themes": (plot_themes_chart, False),
+    "conformity_gauge": (plot_conformity_gauge, False),
+    "charges_distribution": (plot_charges_distribution, True),
+    "conformity_by_category": (plot_conformity_by_category, True),
+    "charges_pie": (plot_charges_pie, True),
+}
+
+def render_plot_png(plot_name, data):
+    """
+    Rend un graphique au format PNG, avec mise en cache selon les données affichées.
+    À afficher avec st.image.
+    
+    Args:
+        plot_name: Nom du graphique ("themes", "conformity_gauge", "charges_distribution",
+            "conformity_by_category" ou "charges_pie")
+        data: Données du graphique (thèmes, niveau de conformité ou liste des charges facturées)
+        
+    Returns:
+        Image PNG sous forme de bytes, ou None s'il n'y a rien à afficher
+    """
+    _, takes_charges = _PLOT_FUNCTIONS[plot_name]
+    if takes_charges:
+        # Clé de cache compacte: seuls les champs utilisés par les graphiques sont conservés
+        data = tuple(
+            (
+                charge.get("poste", ""),
+                charge.get("montant", 0),
+                charge.get("conformite", "à vérifier"),
+                bool(charge.get("contestable", False))
+            )
+            for charge in data or []
+        )
+    elif isinstance(data, list):
+        data = tuple(data)
+    
+    return _render_plot_png_cached(plot_name, data)
+
+@st.cache_data(show_spinner=False, max_entries=16)
+def _render_plot_png_cached(plot_name, data):
+    """
+    Construit le graphique demandé et l'enregistre au format PNG.
+    
+    Args:
+        plot_name: Nom du graphique
+        data: Données du graphique, sous forme hashable
+        
+    Returns:
+        Image PNG sous forme de bytes, ou None s'il n'y a rien à afficher
+    """
+    plot_function, takes_charges = _PLOT_FUNCTIONS[plot_name]
+    if takes_charges:
+        data = [dict(zip(_CHARGE_FIELDS, row)) for row in data]
+    elif isinstance(data, tuple):
+        data = list(data)
+    
+    fig = plot_function(data)
+    if fig is None:
+        return None
+    
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', dpi=100)
+    return buffer.getvalue()
@@ -1,3 +1,8 @@
 """
 Utilitaires pour l'application d'analyse des charges locatives commerciales.
 """
+import os
+
+# Tesseract est exécuté en parallèle (pages, passes, cellules): chaque instance est limitée
+# à un thread OpenMP pour ne pas se disputer les cœurs. Hérité par les sous-processus tesseract.
+os.environ.setdefault("OMP_THREAD_LIMIT", "1")
@@ -0,0 +1,25 @@
+"""
+Utilitaires pour la mise en cache des traitements coûteux.
+"""
+import hashlib
+
+def content_digest(data):
+    """
+    Calcule l'empreinte d'un contenu binaire, utilisée comme clé de cache.
+    
+    Args:
+        data: Contenu binaire (bytes, bytearray ou memoryview)
+        
+    Returns:
+        Empreinte hexadécimale blake2b du contenu
+    """
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+class UncachedResult(Exception):
+    """
+    Levée par une fonction mise en cache pour renvoyer un résultat (échec, analyse incomplète)
+    sans qu'il soit conservé: st.cache_data ne met pas en cache les appels qui lèvent une exception.
+    """
+    def __init__(self, value=None):
+        super().__init__()
+        self.value = value
@@ -0,0 +1,105 @@
+"""
+Utilitaires pour l'exécution concurrente des traitements (OCR, appels API).
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+MAX_WORKERS = 8
+
+# Signal d'abandon du traitement en cours dans chaque thread (voir first_matching_result)
+_cancellation = threading.local()
+
+def cancellation_requested():
+    """
+    Indique si le traitement exécuté par le thread courant a été abandonné, son résultat
+    n'étant plus attendu. Les traitements longs peuvent le consulter pour s'interrompre.
+    
+    Returns:
+        Booléen
+    """
+    event = getattr(_cancellation, "event", None)
+    return event is not None and event.is_set()
+
+def _with_script_context(func, cancel_event=None):
+    """
+    Enveloppe une fonction pour qu'elle s'exécute avec le contexte Streamlit du thread appelant,
+    afin que les threads du pool puissent afficher des messages. Le signal d'abandon du thread
+    appelant est transmis de la même manière, sauf si un autre signal est fourni.
+    
+    Args:
+        func: Fonction à envelopper
+        cancel_event: Signal d'abandon propre à ces traitements (optionnel)
+        
+    Returns:
+        La fonction enveloppée
+    """
+    ctx = get_script_run_ctx()
+    if cancel_event is None:
+        cancel_event = getattr(_cancellation, "event", None)
+    
+    def run_with_context(item):
+        add_script_run_ctx(threading.current_thread(), ctx)
+        _cancellation.event = cancel_event
+        try:
+            return func(item)
+        finally:
+            _cancellation.event = None
+    
+    return run_with_context
+
+def run_in_threads(func, items, max_workers=MAX_WORKERS):
+    """
+    Applique une fonction à chaque élément dans un pool de threads, en conservant l'ordre.
+    
+    Args:
+        func: Fonction à appliquer à chaque élément
+        items: Liste des éléments à traiter
+        max_workers: Nombre maximum de threads
+        
+    Returns:
+        Liste des résultats, dans l'ordre des éléments
+    """
+    items = list(items)
+    if len(items) <= 1:
+        return [func(item) for item in items]
+    
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as executor:
+        return list(executor.map(_with_script_context(func), items))
+
+def first_matching_result(func, items, predicate, max_workers=MAX_WORKERS):
+    """
+    Applique une fonction aux éléments en parallèle et renvoie le résultat du premier élément,
+    dans l'ordre de la liste, qui satisfait le prédicat: le résultat ne dépend pas de l'ordre
+    d'achèvement des threads. Les éléments suivants, seuls encore inachevés à ce moment, sont
+    alors annulés s'ils n'ont pas démarré; ceux déjà en cours sont signalés comme abandonnés
+    (cancellation_requested) et doivent s'arrêter d'eux-mêmes, faute de quoi ils vont jusqu'à
+    leur terme en arrière-plan.
+    
+    Args:
+        func: Fonction à appliquer à chaque élément
+        items: Liste des éléments à traiter
+        predicate: Fonction indiquant si un résultat est satisfaisant
+        max_workers: Nombre maximum de threads
+        
+    Returns:
+        Le résultat satisfaisant du premier élément, ou None
+    """
+    items = list(items)
+    if not items:
+        return None
+    
+    stop = threading.Event()
+    executor = ThreadPoolExecutor(max_workers=min(max_workers, len(items)))
+    try:
+        futures = [executor.submit(_with_script_context(func, stop), item) for item in items]
+        # Parcours dans l'ordre de soumission: quand un résultat convient, tous les
+        # éléments précédents sont terminés et seuls les suivants sont abandonnés
+        for future in futures:
+            result = future.result()
+            if predicate(result):
+                return result
+        return None
+    finally:
+        stop.set()
+        executor.shutdown(wait=False, cancel_futures=True)
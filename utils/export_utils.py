@@ -1,14 +1,17 @@
 """
 Utilitaires pour l'export des résultats d'analyse (PDF, JSON, etc.).
 """
-import json
 import datetime
 import streamlit as st
+from functools import lru_cache
+from xml.sax.saxutils import escape
 from io import BytesIO
+from utils.json_utils import dumps_bytes
+from utils.cache_utils import content_digest, UncachedResult
 
 def export_to_json(analysis):
     """
-    Exporte l'analyse au format JSON.
+    Exporte l'analyse au format JSON compact.
     
     Args:
         analysis: Dictionnaire contenant les résultats d'analyse
@@ -16,7 +19,42 @@ def export_to_json(analysis):
     Returns:
         Données JSON encodées en UTF-8
     """
-    return json.dumps(analysis, indent=2, ensure_ascii=False).encode('utf-8')
+    return dumps_bytes(analysis)
+
+@lru_cache(maxsize=1)
+def _get_pdf_styles():
+    """
+    Construit une seule fois la feuille de styles et les styles de tableaux du rapport PDF.
+    
+    Returns:
+        Tuple (feuille de styles des paragraphes, style du tableau d'informations, style des tableaux à en-tête)
+    """
+    from reportlab.lib import colors
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.platypus import TableStyle
+    
+    styles = getSampleStyleSheet()
+    styles.add(ParagraphStyle(name='Center', parent=styles['Heading1'], alignment=1))
+    styles.add(ParagraphStyle(name='Justify', parent=styles['Normal'], alignment=4))
+    styles.add(ParagraphStyle(name='Small', parent=styles['Normal'], fontSize=8))
+    
+    # Tableau d'informations: première colonne grisée
+    info_style = TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('PADDING', (0, 0), (-1, -1), 6),
+    ])
+    
+    # Tableaux de charges: ligne d'en-tête grisée
+    header_style = TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
+        ('PADDING', (0, 0), (-1, -1), 6),
+    ])
+    
+    return styles, info_style, header_style
 
 def generate_pdf_report(analysis, document_type, text1=None, text2=None):
     """
@@ -31,15 +69,36 @@ def generate_pdf_report(analysis, document_type, text1=None, text2=None):
     Returns:
         Contenu du PDF sous forme de bytes
     """
+    # Le rapport ne dépend que de l'analyse, du type de document et de la date du jour
+    today = datetime.datetime.now().strftime("%d/%m/%Y")
+    digest = content_digest(dumps_bytes(analysis) + f"\x00{document_type}\x00{today}".encode("utf-8"))
+    try:
+        return _generate_pdf_report_cached(digest, analysis, today)
+    except UncachedResult as e:
+        return e.value
+
+@st.cache_data(show_spinner=False, ttl=3600, max_entries=32)
+def _generate_pdf_report_cached(digest, _analysis, today):
+    """
+    Construit le rapport PDF, avec mise en cache selon l'empreinte de l'analyse.
+    
+    Args:
+        digest: Empreinte de l'analyse, du type de document et de la date (clé de cache)
+        _analysis: Dictionnaire contenant les résultats d'analyse
+        today: Date du rapport (JJ/MM/AAAA)
+        
+    Returns:
+        Contenu du PDF sous forme de bytes
+    """
+    analysis = _analysis
     try:
         from reportlab.lib.pagesizes import A4
-        from reportlab.lib import colors
-        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, PageBreak
         from reportlab.lib.units import cm
+        styles, info_style, header_style = _get_pdf_styles()
     except ImportError:
         st.error("La bibliothèque reportlab n'est pas installée. Installez-la avec 'pip install reportlab'")
-        return None
+        raise UncachedResult(None)
     
     # Créer un buffer pour stocker le PDF
     buffer = BytesIO()
@@ -52,14 +111,7 @@ def generate_pdf_report(analysis, document_type, text1=None, text2=None):
     # Contenu du document
     story = []
     
-    # Styles
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='Center', parent=styles['Heading1'], alignment=1))
-    styles.add(ParagraphStyle(name='Justify', parent=styles['Normal'], alignment=4))
-    styles.add(ParagraphStyle(name='Small', parent=styles['Normal'], fontSize=8))
-    
     # Titre et date
-    today = datetime.datetime.now().strftime("%d/%m/%Y")
     title = f"Analyse des Charges Locatives Commerciales"
     story.append(Paragraph(title, styles['Center']))
     story.append(Paragraph(f"Rapport généré le {today}", styles['Normal']))
@@ -82,12 +134,7 @@ def generate_pdf_report(analysis, document_type, text1=None, text2=None):
     
     # Créer un tableau pour les informations
     info_table = Table(info_data, colWidths=[5*cm, 10*cm])
-    info_table.setStyle(TableStyle([
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('BACKGROUND', (0, 0), (0, -1), colors.lightgrey),
-        ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-        ('PADDING', (0, 0), (-1, -1), 6),
-    ]))
+    info_table.setStyle(info_style)
     story.append(info_table)
     story.append(Spacer(1, 0.5*cm))
     
@@ -112,12 +159,7 @@ def generate_pdf_report(analysis, document_type, text1=None, text2=None):
             ])
         
         refac_table = Table(refac_data, colWidths=[4*cm, 7*cm, 4*cm])
-        refac_table.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('PADDING', (0, 0), (-1, -1), 6),
-        ]))
+        refac_table.setStyle(header_style)
         story.append(refac_table)
         story.append(Spacer(1, 0.5*cm))
     
@@ -138,12 +180,7 @@ def generate_pdf_report(analysis, document_type, text1=None, text2=None):
             ])
         
         charges_table = Table(charges_data, colWidths=[6*cm, 2.5*cm, 2*cm, 2.5*cm, 2*cm])
-        charges_table.setStyle(TableStyle([
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-            ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
-            ('PADDING', (0, 0), (-1, -1), 6),
-        ]))
+        charges_table.setStyle(header_style)
         story.append(charges_table)
         story.append(Spacer(1, 0.5*cm))
         
@@ -153,16 +190,19 @@ def generate_pdf_report(analysis, document_type, text1=None, text2=None):
             story.append(Paragraph("Charges potentiellement contestables", styles['Heading2']))
             
             for charge in contestable_charges:
-                charge_title = f"{charge.get('poste', '')} ({charge.get('montant', 0):.2f}€)"
-                story.append(Paragraph(charge_title, styles['Heading3']))
-                story.append(Paragraph(f"Montant: {charge.get('montant', 0):.2f}€ ({charge.get('pourcentage', 0):.1f}% du total)", styles['Normal']))
+                # Un seul paragraphe par charge: le texte n'est analysé qu'une fois par ReportLab
+                lines = [
+                    f"<b>{escape(str(charge.get('poste', '')))} ({charge.get('montant', 0):.2f}€)</b>",
+                    f"Montant: {charge.get('montant', 0):.2f}€ ({charge.get('pourcentage', 0):.1f}% du total)"
+                ]
                 
                 if "raison_contestation" in charge and charge["raison_contestation"]:
-                    story.append(Paragraph(f"Raison: {charge['raison_contestation']}", styles['Normal']))
+                    lines.append(f"Raison: {escape(str(charge['raison_contestation']))}")
                 
                 if "justification" in charge and charge["justification"]:
-                    story.append(Paragraph(f"Justification: {charge['justification']}", styles['Normal']))
-                    
+                    lines.append(f"Justification: {escape(str(charge['justification']))}")
+                
+                story.append(Paragraph("<br/>".join(lines), styles['Normal']))
                 story.append(Spacer(1, 0.3*cm))
     
     # Recommandations
@@ -1,20 +1,26 @@
 """
 Utilitaires pour la gestion et le traitement des fichiers.
 """
+import io
 import streamlit as st
+from utils.concurrency import run_in_threads
 from utils.ocr_utils import (
     extract_text_from_pdf, 
     extract_text_from_docx, 
     extract_text_from_txt, 
-    extract_text_from_image
+    extract_text_from_image,
+    detect_file_type,
+    DOCX_MIME_TYPE
 )
 
-def get_file_content(uploaded_file):
+def get_file_content(uploaded_file, file_type=None, file_name=None):
     """
-    Obtenir le contenu du fichier selon son type.
+    Obtenir le contenu du fichier selon son type, reconnu d'après son contenu.
     
     Args:
-        uploaded_file: Fichier téléchargé
+        uploaded_file: Fichier téléchargé (ou flux binaire)
+        file_type: Type MIME déclaré du fichier, à préciser si uploaded_file n'a pas d'attribut type
+        file_name: Nom du fichier, à préciser si uploaded_file n'a pas d'attribut name
         
     Returns:
         Le contenu textuel du fichier
@@ -22,11 +28,11 @@ def get_file_content(uploaded_file):
     if uploaded_file is None:
         return ""
         
-    file_type = uploaded_file.type
+    file_type = detect_file_type(uploaded_file, file_name, file_type)
     
     if file_type == "application/pdf":
         return extract_text_from_pdf(uploaded_file)
-    elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
+    elif file_type == DOCX_MIME_TYPE:
         return extract_text_from_docx(uploaded_file)
     elif file_type == "text/plain":
         return extract_text_from_txt(uploaded_file)
@@ -46,21 +52,35 @@ def process_multiple_files(uploaded_files):
     Returns:
         Le contenu textuel combiné de tous les fichiers
     """
-    combined_text = ""
-    
     if not uploaded_files:
-        return combined_text
+        return ""
+    
+    def extract_one(file):
+        # Obtenir le contenu du fichier (l'OCR est mis en cache par les extracteurs selon
+        # l'empreinte du contenu). Une erreur n'interrompt pas les autres extractions: elle
+        # est signalée après coup.
+        try:
+            return get_file_content(io.BytesIO(file.getbuffer()), file.type, file.name), None
+        except Exception as e:
+            return "", e
     
     with st.spinner("Extraction du texte des fichiers..."):
-        for file in uploaded_files:
-            # Obtenir le contenu du fichier
-            file_content = get_file_content(file)
-            if file_content:
-                combined_text += f"\n\n--- Début du fichier: {file.name} ---\n\n"
-                combined_text += file_content
-                combined_text += f"\n\n--- Fin du fichier: {file.name} ---\n\n"
+        # Extraction concurrente, résultats dans l'ordre des fichiers
+        results = run_in_threads(extract_one, uploaded_files)
+    
+    # Assemblage en une seule concaténation finale
+    parts = []
+    for file, (file_content, error) in zip(uploaded_files, results):
+        if error is not None:
+            st.warning(f"Erreur lors de l'extraction du fichier {file.name}: {str(error)}")
+        if file_content:
+            parts.extend((
+                f"\n\n--- Début du fichier: {file.name} ---\n\n",
+                file_content,
+                f"\n\n--- Fin du fichier: {file.name} ---\n\n"
+            ))
     
-    return combined_text
+    return "".join(parts)
 
 def validate_file_input(doc1_files, doc2_files):
     """
@@ -0,0 +1,64 @@
+"""
+Utilitaires de sérialisation JSON, basés sur orjson lorsqu'il est disponible.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Exceptions levées lors du parsing (orjson.JSONDecodeError hérite de ValueError)
+JSON_DECODE_ERRORS = (json.JSONDecodeError, ValueError)
+
+def loads(data):
+    """
+    Parse un document JSON.
+
+    Args:
+        data: Texte ou octets JSON
+
+    Returns:
+        L'objet Python correspondant
+    """
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def dumps_bytes(obj, indent=False, sort_keys=False):
+    """
+    Sérialise un objet en JSON encodé en UTF-8.
+
+    Args:
+        obj: Objet à sérialiser
+        indent: Booléen indiquant si la sortie doit être indentée (2 espaces)
+        sort_keys: Booléen indiquant si les clés des dictionnaires doivent être triées
+            (sortie identique quel que soit l'ordre d'insertion, pour les empreintes)
+
+    Returns:
+        Les octets JSON
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, option=option)
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False, sort_keys=sort_keys).encode("utf-8")
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), sort_keys=sort_keys).encode("utf-8")
+
+def dumps(obj, indent=False, sort_keys=False):
+    """
+    Sérialise un objet en chaîne JSON.
+
+    Args:
+        obj: Objet à sérialiser
+        indent: Booléen indiquant si la sortie doit être indentée (2 espaces)
+        sort_keys: Booléen indiquant si les clés des dictionnaires doivent être triées
+
+    Returns:
+        La chaîne JSON
+    """
+    return dumps_bytes(obj, indent, sort_keys).decode("utf-8")
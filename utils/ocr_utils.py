@@ -8,28 +8,96 @@ import docx2txt
 import pytesseract
 import cv2
 import numpy as np
-import tempfile
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import os
 import io
+import codecs
+import threading
 from PIL import Image
 from config import get_ocr_api_key
+from utils.cache_utils import content_digest, UncachedResult
+from utils.concurrency import run_in_threads
+from utils.token_trim import PAGE_BREAK
+
+try:
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+def _opencl_available():
+    """
+    Indique si OpenCV peut exécuter les traitements d'image via OpenCL (cv2.UMat).
+    
+    Returns:
+        Booléen
+    """
+    try:
+        return cv2.ocl.haveOpenCL()
+    except Exception:
+        return False
+
+# Prétraitement sur OpenCL (GPU ou CPU vectorisé) lorsque disponible
+USE_OPENCL = _opencl_available()
+
+OCR_API_URL = "https://api.ocr.space/parse/image"
+# Délais maximaux d'une requête à l'API OCR (connexion, lecture), en secondes
+OCR_API_TIMEOUT = (5, 60)
+
+@st.cache_resource
+def get_ocr_session():
+    """
+    Crée une session HTTP persistante pour l'API OCR.space, partagée entre les reruns Streamlit.
+    Les connexions sont réutilisées (pool) et les échecs de connexion sont retentés.
+    
+    Returns:
+        Session requests
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=4,
+        pool_maxsize=8,
+        max_retries=Retry(total=2, connect=2, read=0, backoff_factor=0.5)
+    )
+    session.mount("https://", adapter)
+    return session
+
+def _call_cached(cached_func, *args):
+    """
+    Appelle une fonction mise en cache qui signale ses échecs par UncachedResult.
+    
+    Args:
+        cached_func: Fonction décorée par st.cache_data
+        *args: Arguments de la fonction
+        
+    Returns:
+        Le résultat de la fonction, mis en cache ou non
+    """
+    try:
+        return cached_func(*args)
+    except UncachedResult as e:
+        return e.value
 
 def preprocess_image_for_ocr(img):
     """
     Prétraitement avancé d'une image pour améliorer les résultats OCR.
     
     Args:
-        img: Image OpenCV à prétraiter
+        img: Image OpenCV à prétraiter (couleur BGR ou déjà en niveaux de gris)
         
     Returns:
         Image prétraitée
     """
-    # Conversion en niveaux de gris
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    # Conversion en niveaux de gris, si l'image ne l'est pas déjà
+    gray = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    
+    # Avec OpenCL, la chaîne de traitements reste sur le périphérique jusqu'au résultat final
+    if USE_OPENCL:
+        gray = cv2.UMat(gray)
     
-    # Appliquer une légère réduction de bruit
-    denoised = cv2.fastNlMeansDenoising(gray, None, 10, 7, 21)
+    # Appliquer une légère réduction de bruit (filtre médian, bien moins coûteux que les moyennes non locales)
+    denoised = cv2.medianBlur(gray, 3)
     
     # Augmenter le contraste
     clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
@@ -38,15 +106,29 @@ def preprocess_image_for_ocr(img):
     # Binarisation avec Otsu pour une meilleure segmentation
     _, thresh = cv2.threshold(contrast_enhanced, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
     
-    # Dilatation légère pour renforcer les caractères
-    kernel = np.ones((1, 1), np.uint8)
-    dilated = cv2.dilate(thresh, kernel, iterations=1)
+    return thresh.get() if isinstance(thresh, cv2.UMat) else thresh
+
+def _ocr_variant(variant):
+    """
+    Exécute une passe OCR sur une variante d'image.
     
-    return dilated
+    Args:
+        variant: Tuple (numéro de méthode, image, mode de segmentation psm)
+        
+    Returns:
+        Le texte extrait, ou une chaîne vide en cas d'erreur
+    """
+    method, image, psm = variant
+    try:
+        return pytesseract.image_to_string(image, lang='fra', config=f'--psm {psm}')
+    except Exception as e:
+        st.warning(f"Erreur OCR méthode {method}: {str(e)}")
+        return ""
 
 def extract_text_with_multiple_methods(img):
     """
     Essaie plusieurs méthodes d'OCR et retourne le meilleur résultat.
+    Les passes Tesseract s'exécutent simultanément (chacune dans un sous-processus).
     
     Args:
         img: Image à analyser
@@ -54,45 +136,76 @@ def extract_text_with_multiple_methods(img):
     Returns:
         Meilleur texte extrait
     """
-    results = []
-    
     # Méthode 1: Image originale
-    try:
-        text1 = pytesseract.image_to_string(img, lang='fra', config='--psm 6')
-        results.append((text1, len(text1.strip())))
-    except Exception as e:
-        st.warning(f"Erreur OCR méthode 1: {str(e)}")
+    variants = [(1, img, 6)]
     
-    # Méthode 2: Prétraitement avancé
-    try:
-        processed = preprocess_image_for_ocr(img)
-        text2 = pytesseract.image_to_string(processed, lang='fra', config='--psm 6')
-        results.append((text2, len(text2.strip())))
-    except Exception as e:
-        st.warning(f"Erreur OCR méthode 2: {str(e)}")
-    
-    # Méthode 3: Binarisation simple
+    # Conversion en niveaux de gris une seule fois, partagée par les méthodes 2 et 3
     try:
         gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        _, binary = cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY)
-        text3 = pytesseract.image_to_string(binary, lang='fra', config='--psm 6')
-        results.append((text3, len(text3.strip())))
     except Exception as e:
-        st.warning(f"Erreur OCR méthode 3: {str(e)}")
+        st.warning(f"Erreur lors de la conversion en niveaux de gris: {str(e)}")
+        gray = None
+    
+    if gray is not None:
+        # Méthode 2: Prétraitement avancé
+        try:
+            variants.append((2, preprocess_image_for_ocr(gray), 6))
+        except Exception as e:
+            st.warning(f"Erreur OCR méthode 2: {str(e)}")
+        
+        # Méthode 3: Binarisation simple
+        try:
+            _, binary = cv2.threshold(gray, 128, 255, cv2.THRESH_BINARY)
+            variants.append((3, binary, 6))
+        except Exception as e:
+            st.warning(f"Erreur OCR méthode 3: {str(e)}")
     
     # Méthode 4: Orientation spécifique pour les tableaux
-    try:
-        text4 = pytesseract.image_to_string(img, lang='fra', config='--psm 4')
-        results.append((text4, len(text4.strip())))
-    except Exception as e:
-        st.warning(f"Erreur OCR méthode 4: {str(e)}")
+    variants.append((4, img, 4))
     
     # Retourner le résultat avec le plus de texte
-    if results:
-        results.sort(key=lambda x: x[1], reverse=True)
-        return results[0][0]
+    texts = run_in_threads(_ocr_variant, variants, max_workers=4)
+    return max(texts, key=lambda text: len(text.strip()), default="")
+
+# Résolution minimale conservée pour l'OCR après un décodage à demi-résolution
+MIN_OCR_DPI = 300
+# Sans résolution de numérisation déclarée: au-delà de cette dimension (côté le plus long, en pixels),
+# l'image est décodée à demi-résolution. Une page A4 numérisée à 300 DPI (3508 px) reste
+# décodée en pleine résolution
+REDUCED_DECODE_THRESHOLD = 5000
+
+def _decode_flags_for(image_bytes):
+    """
+    Choisit la résolution de décodage d'une image: les très grandes images sont décodées
+    directement à demi-résolution lorsque celle-ci reste suffisante pour l'OCR.
+    
+    Args:
+        image_bytes: Contenu binaire de l'image
+        
+    Returns:
+        Drapeau cv2.imdecode
+    """
+    try:
+        # Seul l'en-tête est lu: les pixels ne sont pas décodés
+        with Image.open(io.BytesIO(image_bytes)) as probe:
+            long_side = max(probe.size)
+            dpi = probe.info.get("dpi")
+    except Exception:
+        return cv2.IMREAD_COLOR
+    
+    # Résolution déclarée par un scanner: la demi-résolution doit rester lisible. Les photos
+    # déclarent souvent 72 DPI, sans rapport avec leur finesse: seule leur taille compte
+    try:
+        scan_dpi = min(dpi) if dpi and min(dpi) >= MIN_OCR_DPI / 2 else None
+    except TypeError:
+        scan_dpi = None
+    
+    if scan_dpi is not None:
+        reduce = scan_dpi / 2 >= MIN_OCR_DPI
+    else:
+        reduce = long_side > REDUCED_DECODE_THRESHOLD
     
-    return ""
+    return cv2.IMREAD_REDUCED_COLOR_2 if reduce else cv2.IMREAD_COLOR
 
 def extract_text_from_image(uploaded_file):
     """
@@ -101,25 +214,50 @@ def extract_text_from_image(uploaded_file):
     Args:
         uploaded_file: Fichier image téléchargé
         
+    Returns:
+        Le texte extrait de l'image
+    """
+    image_bytes = uploaded_file.getvalue()
+    return _call_cached(
+        _extract_text_from_image_cached,
+        content_digest(image_bytes),
+        getattr(uploaded_file, "name", ""),
+        image_bytes
+    )
+
+@st.cache_data(show_spinner=False, ttl=24 * 3600, max_entries=64)
+def _extract_text_from_image_cached(digest, file_name, _image_bytes):
+    """
+    Extrait le texte d'une image, avec mise en cache selon l'empreinte de son contenu.
+    Un résultat vide n'est pas mis en cache.
+    
+    Args:
+        digest: Empreinte du contenu de l'image (clé de cache)
+        file_name: Nom du fichier
+        _image_bytes: Contenu binaire de l'image
+        
     Returns:
         Le texte extrait de l'image
     """
     try:
-        image_bytes = uploaded_file.getvalue()
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        nparr = np.frombuffer(_image_bytes, np.uint8)
+        img = cv2.imdecode(nparr, _decode_flags_for(_image_bytes))
         
         # Utiliser la méthode multiple
-        return extract_text_with_multiple_methods(img)
+        text = extract_text_with_multiple_methods(img)
     
     except Exception as e:
         st.warning(f"Erreur lors de l'extraction du texte de l'image: {str(e)}")
         # Tentative de secours avec l'API OCR
         try:
-            return ocr_from_image_using_api(uploaded_file)
+            text = ocr_from_image_using_api(io.BytesIO(_image_bytes))
         except Exception as ocr_e:
             st.warning(f"Erreur API OCR: {str(ocr_e)}")
-            return ""
+            text = ""
+    
+    if not text.strip():
+        raise UncachedResult(text)
+    return text
 
 def extract_text_from_pdf(uploaded_file):
     """
@@ -128,19 +266,36 @@ def extract_text_from_pdf(uploaded_file):
     Args:
         uploaded_file: Fichier PDF téléchargé
         
+    Returns:
+        Le texte extrait du PDF
+    """
+    pdf_bytes = uploaded_file.getvalue()
+    return _call_cached(
+        _extract_text_from_pdf_cached,
+        content_digest(pdf_bytes),
+        getattr(uploaded_file, "name", ""),
+        pdf_bytes
+    )
+
+@st.cache_data(show_spinner=False, ttl=24 * 3600, max_entries=64)
+def _extract_text_from_pdf_cached(digest, file_name, _pdf_bytes):
+    """
+    Extrait le texte d'un PDF, avec mise en cache selon l'empreinte de son contenu.
+    Un résultat vide n'est pas mis en cache.
+    
+    Args:
+        digest: Empreinte du contenu du PDF (clé de cache)
+        file_name: Nom du fichier
+        _pdf_bytes: Contenu binaire du PDF
+        
     Returns:
         Le texte extrait du PDF
     """
     text = ""
     
-    # Essayer d'abord l'extraction native de PyPDF2
+    # Essayer d'abord l'extraction native (PDFium si disponible, sinon PyPDF2)
     try:
-        uploaded_file.seek(0)
-        pdf_reader = PyPDF2.PdfReader(uploaded_file)
-        for page_num in range(len(pdf_reader.pages)):
-            page_text = pdf_reader.pages[page_num].extract_text()
-            if page_text:
-                text += page_text + "\n"
+        text = extract_native_pdf_text(_pdf_bytes)
     except Exception as e:
         st.warning(f"Extraction native du PDF non réussie: {str(e)}")
     
@@ -148,62 +303,143 @@ def extract_text_from_pdf(uploaded_file):
     if len(text.strip()) < 100:  # Seuil arbitraire pour déterminer si l'extraction est insuffisante
         st.info("Extraction de texte limitée, utilisation de l'OCR...")
         
+        # Utiliser directement l'API OCR external comme méthode fiable
+        api_text = ocr_from_pdf_using_api(io.BytesIO(_pdf_bytes))
+        if api_text:
+            return api_text
+        
+        # Sinon, OCR local des pages rendues en images
         try:
-            # Utiliser directement l'API OCR external comme méthode fiable
-            uploaded_file.seek(0)
-            text = ocr_from_pdf_using_api(uploaded_file)
-            if text:
-                return text
-                
-        except Exception as e:
-            st.warning(f"Erreur lors de l'OCR du PDF via API: {str(e)}")
+            # OCR sur chaque page (DPI élevé pour une meilleure qualité)
+            page_texts = ocr_pdf_pages(_pdf_bytes, dpi=300)
+            
+            # Si on a des résultats d'OCR, les utiliser
+            if any(page_texts):
+                text = PAGE_BREAK.join(page_texts)
+            
+        except ImportError:
+            st.warning("Ni pypdfium2 ni pdf2image (avec poppler) ne sont correctement installés: OCR local impossible.")
             
-            # Essayer avec pdf2image mais gérer gracieusement les erreurs
-            try:
-                # Import conditionnel pour éviter les erreurs d'importation
-                from pdf2image import convert_from_bytes
-                
-                uploaded_file.seek(0)
-                pdf_bytes = uploaded_file.getvalue()
-                
-                with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-                    tmp.write(pdf_bytes)
-                    temp_pdf_path = tmp.name
-                
-                # Augmenter le DPI pour une meilleure qualité
-                images = convert_from_bytes(pdf_bytes, dpi=300)
-                
-                # Nettoyer le fichier temporaire
-                try:
-                    os.unlink(temp_pdf_path)
-                except:
-                    pass
-                
-                # OCR sur chaque page
-                page_texts = []
-                for i, img in enumerate(images):
-                    with st.spinner(f"OCR sur la page {i+1}/{len(images)}..."):
-                        # Convertir PIL Image en format OpenCV
-                        open_cv_image = np.array(img)
-                        # RGB vers BGR (format OpenCV)
-                        open_cv_image = open_cv_image[:, :, ::-1].copy()
-                        
-                        # Extraire le texte avec notre méthode multiple
-                        page_text = extract_text_with_multiple_methods(open_cv_image)
-                        page_texts.append(page_text)
-                
-                # Si on a des résultats d'OCR, les utiliser
-                if any(page_texts):
-                    text = "\n\n".join(page_texts)
-                
-            except ImportError:
-                st.warning("pdf2image ou poppler n'est pas correctement installé. Utilisation de l'API OCR.")
-                
-            except Exception as pdf2image_error:
-                st.warning(f"Erreur lors de l'utilisation de pdf2image: {str(pdf2image_error)}")
+        except Exception as render_error:
+            st.warning(f"Erreur lors du rendu des pages du PDF: {str(render_error)}")
 
+    if not text.strip():
+        raise UncachedResult(text)
     return text
 
+def extract_native_pdf_text(pdf_bytes):
+    """
+    Extrait le texte natif d'un PDF, avec PDFium (pypdfium2) s'il est installé, sinon PyPDF2.
+    
+    Args:
+        pdf_bytes: Contenu binaire du PDF
+        
+    Returns:
+        Le texte des pages, séparées par PAGE_BREAK
+    """
+    if pdfium is not None:
+        pdf = pdfium.PdfDocument(pdf_bytes)
+        try:
+            parts = []
+            for page in pdf:
+                textpage = page.get_textpage()
+                parts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+            return PAGE_BREAK.join(part for part in parts if part)
+        finally:
+            pdf.close()
+    
+    parts = []
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(pdf_bytes))
+    for page in pdf_reader.pages:
+        page_text = page.extract_text()
+        if page_text:
+            parts.append(page_text)
+    return PAGE_BREAK.join(parts)
+
+# Nombre de pages rendues en mémoire simultanément lors de l'OCR d'un PDF
+PDF_PAGE_CHUNK = 10
+
+def iter_pdf_page_chunks(pdf_bytes, dpi=300, chunk_size=PDF_PAGE_CHUNK):
+    """
+    Rend les pages d'un PDF en images par lots, avec PDFium (pypdfium2) s'il est installé,
+    sinon pdf2image. Seul le lot en cours est conservé en mémoire.
+    
+    Args:
+        pdf_bytes: Contenu binaire du PDF
+        dpi: Résolution du rendu
+        chunk_size: Nombre de pages par lot
+        
+    Yields:
+        Tuple (nombre total de pages, liste des pages du lot en images PIL)
+        
+    Raises:
+        ImportError: si aucune des deux bibliothèques n'est disponible
+    """
+    if pdfium is not None:
+        pdf = pdfium.PdfDocument(pdf_bytes)
+        try:
+            page_count = len(pdf)
+            for first in range(0, page_count, chunk_size):
+                last = min(first + chunk_size, page_count)
+                images = []
+                for index in range(first, last):
+                    page = pdf[index]
+                    images.append(page.render(scale=dpi / 72).to_pil())
+                    page.close()
+                yield page_count, images
+        finally:
+            pdf.close()
+        return
+    
+    # Import conditionnel pour éviter les erreurs d'importation
+    from pdf2image import convert_from_bytes, pdfinfo_from_bytes
+    page_count = pdfinfo_from_bytes(pdf_bytes)["Pages"]
+    for first in range(1, page_count + 1, chunk_size):
+        last = min(first + chunk_size - 1, page_count)
+        yield page_count, convert_from_bytes(
+            pdf_bytes, dpi=dpi, first_page=first, last_page=last,
+            thread_count=min(os.cpu_count() or 1, last - first + 1)
+        )
+
+def ocr_pdf_pages(pdf_bytes, dpi=300):
+    """
+    Applique l'OCR aux pages d'un PDF, rendues par lots et traitées simultanément au sein
+    de chaque lot, avec une barre de progression unique.
+    
+    Args:
+        pdf_bytes: Contenu binaire du PDF
+        dpi: Résolution du rendu
+        
+    Returns:
+        Liste des textes extraits, dans l'ordre des pages
+    """
+    progress = st.progress(0.0, text="OCR des pages...")
+    done = [0]
+    lock = threading.Lock()
+    page_texts = []
+    
+    for page_count, images in iter_pdf_page_chunks(pdf_bytes, dpi):
+        def ocr_page(img):
+            # Convertir PIL Image en format OpenCV (RGB vers BGR)
+            if img.mode != "RGB":
+                img = img.convert("RGB")
+            open_cv_image = cv2.cvtColor(np.asarray(img), cv2.COLOR_RGB2BGR)
+            
+            # Extraire le texte avec notre méthode multiple
+            page_text = extract_text_with_multiple_methods(open_cv_image)
+            
+            with lock:
+                done[0] += 1
+                progress.progress(done[0] / page_count, text=f"OCR: {done[0]}/{page_count} page(s) traitée(s)")
+            return page_text
+        
+        page_texts.extend(run_in_threads(ocr_page, images, max_workers=min(os.cpu_count() or 1, len(images) or 1)))
+    
+    progress.empty()
+    return page_texts
+
 def ocr_from_image_using_api(uploaded_file):
     """
     Utilise l'API OCR.space pour extraire le texte d'une image.
@@ -211,21 +447,44 @@ def ocr_from_image_using_api(uploaded_file):
     Args:
         uploaded_file: Fichier image téléchargé
         
+    Returns:
+        Le texte extrait via l'API OCR
+    """
+    image_bytes = uploaded_file.getvalue()
+    return _call_cached(
+        _ocr_from_image_using_api_cached,
+        content_digest(image_bytes),
+        getattr(uploaded_file, "name", ""),
+        image_bytes
+    )
+
+@st.cache_data(show_spinner=False, ttl=24 * 3600, max_entries=64)
+def _ocr_from_image_using_api_cached(digest, file_name, _image_bytes):
+    """
+    Appelle l'API OCR.space pour une image, avec mise en cache selon l'empreinte de son contenu.
+    Un échec n'est pas mis en cache.
+    
+    Args:
+        digest: Empreinte du contenu de l'image (clé de cache)
+        file_name: Nom du fichier
+        _image_bytes: Contenu binaire de l'image
+        
     Returns:
         Le texte extrait via l'API OCR
     """
     try:
         OCR_API_KEY = get_ocr_api_key()
         
-        response = requests.post(
-            "https://api.ocr.space/parse/image",
-            files={'file': uploaded_file.getvalue()},
+        response = get_ocr_session().post(
+            OCR_API_URL,
+            files={'file': (file_name or 'image', _image_bytes)},
             data={
                 'apikey': OCR_API_KEY,
                 'language': 'fre',
                 'isTable': True,
                 'OCREngine': 2  # Utiliser le moteur OCR le plus précis
-            }
+            },
+            timeout=OCR_API_TIMEOUT
         )
         
         result = response.json()
@@ -238,11 +497,13 @@ def ocr_from_image_using_api(uploaded_file):
             return parsed_text
         else:
             st.warning("Erreur dans le traitement OCR API: " + result.get("ErrorMessage", "Erreur inconnue"))
-            return ""
+            raise UncachedResult("")
     
+    except UncachedResult:
+        raise
     except Exception as e:
         st.warning(f"Erreur lors de l'utilisation de l'API OCR: {str(e)}")
-        return ""
+        raise UncachedResult("")
 
 def ocr_from_pdf_using_api(uploaded_file):
     """
@@ -251,36 +512,48 @@ def ocr_from_pdf_using_api(uploaded_file):
     Args:
         uploaded_file: Fichier PDF téléchargé
         
+    Returns:
+        Le texte extrait du PDF via OCR
+    """
+    pdf_bytes = uploaded_file.getvalue()
+    return _call_cached(
+        _ocr_from_pdf_using_api_cached,
+        content_digest(pdf_bytes),
+        getattr(uploaded_file, "name", ""),
+        pdf_bytes
+    )
+
+@st.cache_data(show_spinner=False, ttl=24 * 3600, max_entries=64)
+def _ocr_from_pdf_using_api_cached(digest, file_name, _pdf_bytes):
+    """
+    Appelle l'API OCR.space pour un PDF, avec mise en cache selon l'empreinte de son contenu.
+    Un échec n'est pas mis en cache.
+    
+    Args:
+        digest: Empreinte du contenu du PDF (clé de cache)
+        file_name: Nom du fichier
+        _pdf_bytes: Contenu binaire du PDF
+        
     Returns:
         Le texte extrait du PDF via OCR
     """
     try:
         OCR_API_KEY = get_ocr_api_key()
         
-        # Sauvegarder le fichier uploadé sur le système de fichiers temporaire
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as tmp:
-            tmp.write(uploaded_file.getvalue())
-            temp_pdf_path = tmp.name
-        
-        with open(temp_pdf_path, 'rb') as file:
-            response = requests.post(
-                "https://api.ocr.space/parse/image",
-                files={'file': file},
-                data={
-                    'apikey': OCR_API_KEY,
-                    'language': 'fre',
-                    'isTable': True,
-                    'OCREngine': 2,  # Moteur plus précis
-                    'scale': True,   # Redimensionnement automatique
-                    'detectOrientation': True
-                }
-            )
-
-        # Nettoyer le fichier temporaire
-        try:
-            os.unlink(temp_pdf_path)
-        except:
-            pass
+        # Envoi direct des octets du PDF, sans passer par un fichier temporaire
+        response = get_ocr_session().post(
+            OCR_API_URL,
+            files={'file': (file_name or 'document.pdf', _pdf_bytes, 'application/pdf')},
+            data={
+                'apikey': OCR_API_KEY,
+                'language': 'fre',
+                'isTable': True,
+                'OCREngine': 2,  # Moteur plus précis
+                'scale': True,   # Redimensionnement automatique
+                'detectOrientation': True
+            },
+            timeout=OCR_API_TIMEOUT
+        )
 
         result = response.json()
 
@@ -292,11 +565,13 @@ def ocr_from_pdf_using_api(uploaded_file):
             return parsed_text
         else:
             st.warning("Erreur dans le traitement OCR API: " + result.get("ErrorMessage", "Erreur inconnue"))
-            return ""
+            raise UncachedResult("")
     
+    except UncachedResult:
+        raise
     except Exception as e:
         st.warning(f"Erreur lors de l'OCR du PDF via API: {str(e)}")
-        return ""
+        raise UncachedResult("")
 
 def extract_text_from_docx(uploaded_file):
     """
@@ -331,34 +606,82 @@ def extract_text_from_txt(uploaded_file):
         st.warning(f"Erreur lors de l'extraction du texte du fichier TXT: {str(e)}")
         return ""
 
-def process_file_with_fallback(uploaded_file):
+DOCX_MIME_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
+# Signatures binaires (premiers octets) des formats reconnus
+_MAGIC_TYPES = (
+    (b"%PDF", "application/pdf"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG", "image/png"),
+)
+
+# Nombre d'octets examinés pour reconnaître un fichier texte
+TEXT_SNIFF_BYTES = 4096
+
+def detect_file_type(uploaded_file, file_name=None, declared_type=None):
+    """
+    Détermine le type d'un fichier d'après son contenu plutôt que d'après le type MIME
+    déclaré par le navigateur, qui peut être erroné ou générique (application/octet-stream).
+    
+    Args:
+        uploaded_file: Fichier téléchargé (ou flux binaire)
+        file_name: Nom du fichier (par défaut, celui de uploaded_file)
+        declared_type: Type MIME déclaré (par défaut, celui de uploaded_file)
+        
+    Returns:
+        Le type MIME reconnu, ou le type déclaré à défaut
+    """
+    file_name = (file_name or getattr(uploaded_file, "name", "") or "").lower()
+    declared_type = declared_type or getattr(uploaded_file, "type", None) or "application/octet-stream"
+    head = bytes(uploaded_file.getbuffer()[:TEXT_SNIFF_BYTES])
+    
+    for magic, mime_type in _MAGIC_TYPES:
+        if head.startswith(magic):
+            return mime_type
+    
+    # Un document Word est une archive ZIP
+    if head.startswith(b"PK"):
+        if file_name.endswith(".docx") or declared_type == DOCX_MIME_TYPE:
+            return DOCX_MIME_TYPE
+        return declared_type
+    
+    # Texte brut: les premiers octets doivent être de l'UTF-8 valide (caractère coupé en fin de bloc toléré)
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(head, final=False)
+        return "text/plain"
+    except UnicodeDecodeError:
+        return declared_type
+
+def process_file_with_fallback(uploaded_file, file_type=None, file_name=None):
     """
     Traite un fichier avec plusieurs méthodes de secours.
     
     Args:
-        uploaded_file: Fichier téléchargé
+        uploaded_file: Fichier téléchargé (ou flux binaire)
+        file_type: Type MIME déclaré du fichier, à préciser si uploaded_file n'a pas d'attribut type
+        file_name: Nom du fichier, à préciser si uploaded_file n'a pas d'attribut name
         
     Returns:
         Le contenu textuel du fichier
     """
-    file_type = uploaded_file.type
+    file_type = detect_file_type(uploaded_file, file_name, file_type)
     
     # Première tentative: méthode standard selon le type de fichier
     if file_type == "application/pdf":
         text = extract_text_from_pdf(uploaded_file)
-    elif file_type == "application/vnd.openxmlformats-officedocument.wordprocessingml.document":
+    elif file_type == DOCX_MIME_TYPE:
         text = extract_text_from_docx(uploaded_file)
     elif file_type == "text/plain":
         text = extract_text_from_txt(uploaded_file)
     elif file_type.startswith("image/"):
         text = extract_text_from_image(uploaded_file)
     else:
-        st.warning(f"Type de fichier non pris en charge: {file_type}. Tentative d'OCR générique.")
-        # Tenter OCR générique pour les types non reconnus
-        text = ocr_from_image_using_api(uploaded_file)
+        # Contenu non reconnu: un appel à l'API OCR serait inutile
+        st.warning(f"Type de fichier non pris en charge: {file_type}")
+        return ""
     
-    # Si le texte est vide ou très court, essayer l'API OCR comme secours final
-    if len(text.strip()) < 50:
+    # Si le texte est vide ou très court, essayer l'API OCR comme secours final (PDF et images uniquement)
+    if len(text.strip()) < 50 and (file_type == "application/pdf" or file_type.startswith("image/")):
         st.warning("Extraction de texte insuffisante. Tentative avec API OCR.")
         uploaded_file.seek(0)
         if file_type == "application/pdf":
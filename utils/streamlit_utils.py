@@ -0,0 +1,21 @@
+"""
+Utilitaires de compatibilité entre versions de Streamlit.
+"""
+import streamlit as st
+
+def _run_whole_script(func):
+    """
+    Repli lorsque les fragments ne sont pas disponibles: la fonction est exécutée
+    à chaque réexécution complète du script.
+    
+    Args:
+        func: Fonction à décorer
+        
+    Returns:
+        La fonction inchangée
+    """
+    return func
+
+# Décorateur limitant la réexécution à une partie de la page (st.fragment depuis Streamlit 1.37,
+# st.experimental_fragment depuis 1.33)
+fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None) or _run_whole_script
@@ -7,20 +7,192 @@ import pandas as pd
 import pytesseract
 import streamlit as st
 import re
+import bisect
 import tempfile
+import shutil
 import os
 import io
+import threading
+import queue
+from contextlib import contextmanager
+from functools import lru_cache
 from PIL import Image
+from utils.concurrency import run_in_threads, cancellation_requested
+from utils.ocr_utils import USE_OPENCL
 
-def detect_table_boundaries(img):
+try:
+    from tesserocr import PyTessBaseAPI, PSM, OEM, RIL, iterate_level
+except ImportError:
+    PyTessBaseAPI = None
+
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# Caractères reconnus dans les cellules de tableaux
+CELL_CHAR_WHITELIST = "ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789,.€ -/&"
+
+# Résolution indiquée à tesseract pour les tableaux (pages rendues ou numérisées à 300 DPI),
+# qui lui évite d'estimer l'échelle du texte
+TABLE_OCR_DPI = 300
+
+# Configuration tesseract pour les cellules et tableaux
+CELL_OCR_CONFIG = f'--psm 6 --oem 1 --dpi {TABLE_OCR_DPI} -c tessedit_char_whitelist="{CELL_CHAR_WHITELIST}"'
+
+# Hauteur minimale (en pixels) d'une cellule avant OCR: les cellules plus petites sont agrandies
+CELL_TARGET_HEIGHT = 40
+
+# Niveau de gris en dessous duquel un pixel est considéré comme encré, et inverse de la
+# proportion minimale de pixels encrés d'une cellule à traiter (1/50, soit 2 %)
+INK_LEVEL = 200
+BLANK_CELL_INK_RATIO = 50
+
+# Motifs et mots-clés utilisés pour interpréter les tableaux de charges
+_AMOUNT_RE = re.compile(r'(\d+[,.]\d+|\d+)')
+_HAS_NUM_RE = re.compile(r'\d+([,.]\d+)?')
+# Ligne "texte descriptif + montant"
+_AMOUNT_IN_LINE_RE = re.compile(r'([A-Za-zÀ-ÿ\s\-\/&\.]+)\s+(\d[\d\s]*[\.,]\d+)')
+# Titre de la section du relevé individuel des charges
+RELEVE_SECTION_TITLE = "RELEVE INDIVIDUEL DES CHARGES LOCATIVES"
+# Ligne de charge (libellé en majuscules + montant) du relevé individuel des charges
+_SECTION_LINE_RE = re.compile(r'([A-Z][A-Z\s]+)\s+(\d[\d\s]*[\.,]\d+)\s*€?')
+# Postes de charges spécifiques au format du document
+CHARGE_KEYWORDS = (
+    "NETTOYAGE EXTERIEUR", "DECHETS SECS", "HYGIENE SANTE", "ELECTRICITE ABORDS", "STRUCTURE", "VRD",
+    "ESPACES VERTS", "MOYENS DE PROTECTION", "SURVEILLANCE", "GESTION ADMINISTRATION", "HONORAIRES GESTION"
+)
+_CHARGE_KEYWORDS_RE = re.compile(r'(' + '|'.join(CHARGE_KEYWORDS) + r')\s+(\d[\d\s]*[\.,]\d+)')
+# Montant qui suit immédiatement un poste de charge
+_AMOUNT_TAIL_RE = re.compile(r'\s+(\d[\d\s]*[\.,]\d+)')
+
+# Automate de recherche simultanée des postes de charges, si pyahocorasick est installé
+if ahocorasick is not None:
+    _CHARGE_KEYWORDS_AUTOMATON = ahocorasick.Automaton()
+    for _keyword in CHARGE_KEYWORDS:
+        _CHARGE_KEYWORDS_AUTOMATON.add_word(_keyword, _keyword)
+    _CHARGE_KEYWORDS_AUTOMATON.make_automaton()
+else:
+    _CHARGE_KEYWORDS_AUTOMATON = None
+DESC_KEYWORDS = ("désignation", "designation", "libellé", "libelle", "desc", "poste")
+AMOUNT_KEYWORDS = ("montant", "total", "ht", "ttc", "somme", "euros")
+TOTAL_LABELS = frozenset({"total", "sous-total", "somme", "montant"})
+
+# Pool d'instances tesserocr partagé par tout le processus: le modèle reste chargé
+# d'une cellule à l'autre et d'un rerun à l'autre, quel que soit le thread appelant
+@st.cache_resource
+def _get_cell_ocr_pool():
+    """
+    Crée le pool d'instances tesserocr, partagé entre les threads et les reruns Streamlit.
+    
+    Returns:
+        File des instances PyTessBaseAPI disponibles
+    """
+    return queue.Queue()
+
+def _new_cell_ocr_api():
+    """
+    Crée une instance tesserocr configurée pour les cellules de tableaux.
+    
+    Returns:
+        Instance PyTessBaseAPI
+    """
+    api = PyTessBaseAPI(lang='fra', psm=PSM.SINGLE_BLOCK, oem=OEM.LSTM_ONLY)
+    api.SetVariable('tessedit_char_whitelist', CELL_CHAR_WHITELIST)
+    api.SetVariable('user_defined_dpi', str(TABLE_OCR_DPI))
+    return api
+
+@contextmanager
+def _cell_ocr_api():
+    """
+    Emprunte une instance tesserocr au pool et la rend à la sortie du bloc.
+    Une nouvelle instance n'est créée que si toutes sont en cours d'utilisation: le
+    nombre d'instances reste borné par le nombre d'OCR simultanés.
+    
+    Yields:
+        Instance PyTessBaseAPI à usage exclusif du bloc
+    """
+    pool = _get_cell_ocr_pool()
+    try:
+        api = pool.get_nowait()
+    except queue.Empty:
+        api = _new_cell_ocr_api()
+    try:
+        yield api
+    finally:
+        pool.put(api)
+
+# Noyau de dilatation des bords, partagé par tous les appels (5x5: équivalent à deux
+# dilatations 3x3, en un seul passage)
+_DILATE_KERNEL = np.ones((5, 5), np.uint8)
+
+# Un objet CLAHE par thread (ces objets ne peuvent pas être partagés entre threads)
+_clahe_local = threading.local()
+
+def _get_clahe():
     """
-    Détecte les contours d'un tableau dans une image.
+    Renvoie l'objet CLAHE du thread courant, créé au premier appel.
+    
+    Returns:
+        Objet CLAHE utilisé pour le contraste des tableaux
+    """
+    clahe = getattr(_clahe_local, "clahe", None)
+    if clahe is None:
+        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
+        _clahe_local.clahe = clahe
+    return clahe
+
+# Dimension maximale (côté le plus long, en pixels) de l'image utilisée pour détecter
+# les contours de tableaux; les images plus grandes sont réduites pour la détection
+BOUNDARY_MAX_DIM = 1024
+
+def _large_components(mask, min_area):
+    """
+    Renvoie les rectangles englobants des régions connexes d'un masque binaire dont la
+    surface englobée dépasse un seuil. Les rectangles contenus dans un autre sont ignorés.
+    
+    Args:
+        mask: Masque binaire
+        min_area: Surface minimale du rectangle englobant
+        
+    Returns:
+        Liste de rectangles (x, y, largeur, hauteur)
+    """
+    _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+    boxes = stats[1:, :4]  # Ignorer le fond (étiquette 0)
+    boxes = boxes[boxes[:, 2] * boxes[:, 3] > min_area].tolist()
+    
+    # Ne garder que les régions extérieures, comme le feraient des contours externes
+    return [
+        (x, y, w, h) for x, y, w, h in boxes
+        if not any(
+            (ox, oy, ow, oh) != (x, y, w, h) and ox <= x and oy <= y and x + w <= ox + ow and y + h <= oy + oh
+            for ox, oy, ow, oh in boxes
+        )
+    ]
+
+def _to_array(mat):
+    """
+    Ramène une image OpenCL (cv2.UMat) en tableau NumPy.
+    
+    Args:
+        mat: Image cv2.UMat ou tableau NumPy
+        
+    Returns:
+        Tableau NumPy
+    """
+    return mat.get() if isinstance(mat, cv2.UMat) else mat
+
+def detect_table_boundaries(img, gray=None):
+    """
+    Détecte les rectangles englobants des tableaux potentiels d'une image.
     
     Args:
         img: Image OpenCV
+        gray: Image en niveaux de gris déjà calculée (optionnel)
         
     Returns:
-        Contours détectés des potentiels tableaux
+        Liste de rectangles (x, y, largeur, hauteur), en coordonnées de l'image d'origine
     """
     # Vérifier que l'image est valide
     if img is None or img.size == 0:
@@ -28,74 +200,107 @@ def detect_table_boundaries(img):
         return []
         
     try:
-        # Conversion en niveaux de gris
-        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-        
-        # Réduction du bruit
-        blur = cv2.GaussianBlur(gray, (5, 5), 0)
-        
-        # Détection des bords
-        edges = cv2.Canny(blur, 50, 150, apertureSize=3)
-        
-        # Amélioration des lignes par dilatation
-        kernel = np.ones((3, 3), np.uint8)
-        dilated = cv2.dilate(edges, kernel, iterations=2)
-        
-        # Détecter les contours
-        contours, _ = cv2.findContours(dilated, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-        
-        # Filtrer les contours par taille (pour éliminer le bruit)
-        min_area = img.shape[0] * img.shape[1] * 0.05  # Au moins 5% de l'image
-        large_contours = [cnt for cnt in contours if cv2.contourArea(cnt) > min_area]
-        
-        return large_contours
+        # Conversion en niveaux de gris, si elle n'a pas déjà été faite
+        if gray is None:
+            gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        
+        # Les bordures de tableaux sont longues: une résolution réduite suffit à les détecter
+        full_height, full_width = gray.shape[:2]
+        scale = max(full_height, full_width) / BOUNDARY_MAX_DIM
+        if scale > 1:
+            gray = cv2.resize(gray, None, fx=1 / scale, fy=1 / scale, interpolation=cv2.INTER_AREA)
+        
+        # Taille minimale des régions retenues (pour éliminer le bruit)
+        height, width = gray.shape[:2]
+        min_area = height * width * 0.05  # Au moins 5% de l'image
+        
+        # Traitements par pixel sur OpenCL (GPU ou CPU vectorisé) lorsque disponible;
+        # seule l'image finale est ramenée en mémoire pour l'étiquetage des régions
+        src = cv2.UMat(gray) if USE_OPENCL else gray
+        
+        # Extraction des lignes horizontales et verticales des bordures de tableaux
+        _, bw = cv2.threshold(src, 0, 255, cv2.THRESH_BINARY_INV | cv2.THRESH_OTSU)
+        h_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(1, width // 30), 1))
+        v_kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (1, max(1, height // 30)))
+        grid = cv2.bitwise_or(
+            cv2.morphologyEx(bw, cv2.MORPH_OPEN, h_kernel),
+            cv2.morphologyEx(bw, cv2.MORPH_OPEN, v_kernel)
+        )
+        rects = _large_components(_to_array(grid), min_area)
+        
+        # Tableaux sans bordures: repli sur la détection des bords
+        if not rects:
+            blur = cv2.GaussianBlur(src, (5, 5), 0)
+            edges = cv2.Canny(blur, 50, 150, apertureSize=3)
+            dilated = cv2.dilate(edges, _DILATE_KERNEL)
+            rects = _large_components(_to_array(dilated), min_area)
+        
+        # Ramener les rectangles aux coordonnées de l'image d'origine
+        if scale > 1:
+            scaled_rects = []
+            for x, y, w, h in rects:
+                x1, y1 = round(x * scale), round(y * scale)
+                x2, y2 = min(round((x + w) * scale), full_width), min(round((y + h) * scale), full_height)
+                scaled_rects.append((x1, y1, x2 - x1, y2 - y1))
+            rects = scaled_rects
+        
+        return rects
     except Exception as e:
         st.warning(f"Erreur lors de la détection des contours du tableau: {str(e)}")
         return []
 
-def extract_tables_from_image(img):
+def find_table_regions(img, gray=None):
     """
-    Extrait plusieurs tableaux d'une image.
+    Localise les tableaux d'une image.
     
     Args:
         img: Image OpenCV
+        gray: Image en niveaux de gris déjà calculée (optionnel)
         
     Returns:
-        Liste de sous-images contenant des tableaux
+        Liste de rectangles (x, y, largeur, hauteur) des tableaux
     """
     if img is None or img.size == 0:
         return []
         
-    try:
-        contours = detect_table_boundaries(img)
-        tables = []
+    regions = []
+    
+    for x, y, w, h in detect_table_boundaries(img, gray):
+        # Vérifier que les dimensions sont valides
+        if w <= 0 or h <= 0 or x + w > img.shape[1] or y + h > img.shape[0]:
+            continue
         
-        for contour in contours:
-            # Créer un rectangle autour du contour
-            x, y, w, h = cv2.boundingRect(contour)
-            
-            # Vérifier que les dimensions sont valides
-            if w <= 0 or h <= 0 or x + w > img.shape[1] or y + h > img.shape[0]:
-                continue
-                
-            # Extraire la zone du tableau
-            table_roi = img[y:y+h, x:x+w]
-            
-            # Vérifier que l'extraction a réussi
-            if table_roi is not None and table_roi.size > 0:
-                tables.append(table_roi)
+        regions.append((x, y, w, h))
+    
+    return regions
+
+def extract_tables_with_gray(img):
+    """
+    Extrait les tableaux d'une image avec leur version en niveaux de gris, obtenue
+    par découpage d'une seule conversion de la page entière.
+    
+    Args:
+        img: Image OpenCV
         
-        return tables
-    except Exception as e:
-        st.warning(f"Erreur lors de l'extraction des tableaux: {str(e)}")
+    Returns:
+        Liste de tuples (sous-image du tableau, sous-image en niveaux de gris)
+    """
+    if img is None or img.size == 0:
         return []
+    
+    gray_page = img if img.ndim == 2 else cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+    return [
+        (img[y:y+h, x:x+w], gray_page[y:y+h, x:x+w])
+        for x, y, w, h in find_table_regions(img, gray_page)
+    ]
 
-def preprocess_table_image(table_img):
+def preprocess_table_image(table_img, gray=None):
     """
     Prétraite l'image d'un tableau pour améliorer l'OCR.
     
     Args:
         table_img: Image du tableau
+        gray: Image du tableau en niveaux de gris déjà calculée (optionnel)
         
     Returns:
         Image prétraitée
@@ -104,38 +309,92 @@ def preprocess_table_image(table_img):
         return None
         
     try:
-        # Conversion en niveaux de gris
-        gray = cv2.cvtColor(table_img, cv2.COLOR_BGR2GRAY)
+        # Conversion en niveaux de gris, si elle n'a pas déjà été faite
+        if gray is None:
+            gray = cv2.cvtColor(table_img, cv2.COLOR_BGR2GRAY)
         
         # Augmentation du contraste
-        clahe = cv2.createCLAHE(clipLimit=2.0, tileGridSize=(8, 8))
-        contrasted = clahe.apply(gray)
+        contrasted = _get_clahe().apply(gray)
         
-        # Binarisation adaptative
+        # Binarisation adaptative, directement en texte noir sur fond blanc pour l'OCR
         binary = cv2.adaptiveThreshold(
             contrasted, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, 
-            cv2.THRESH_BINARY_INV, 15, 10
+            cv2.THRESH_BINARY, 15, 10
         )
         
-        # Opérations morphologiques pour nettoyer l'image
-        kernel = np.ones((1, 1), np.uint8)
-        opening = cv2.morphologyEx(binary, cv2.MORPH_OPEN, kernel)
-        closing = cv2.morphologyEx(opening, cv2.MORPH_CLOSE, kernel)
+        return binary
+    except Exception as e:
+        st.warning(f"Erreur lors du prétraitement de l'image du tableau: {str(e)}")
+        return None
+
+def prepare_cell_image(cell_img):
+    """
+    Prétraitement spécifique pour les cellules: agrandissement des petites cellules
+    puis binarisation.
+    
+    Args:
+        cell_img: Image d'une cellule, en niveaux de gris
+        
+    Returns:
+        Image binaire de la cellule
+    """
+    # Agrandir uniquement les cellules dont le texte est trop petit pour l'OCR
+    height = cell_img.shape[0]
+    gray = cell_img
+    if height < CELL_TARGET_HEIGHT:
+        scale = CELL_TARGET_HEIGHT / height
+        interpolation = cv2.INTER_LINEAR if scale <= 2 else cv2.INTER_LANCZOS4
+        gray = cv2.resize(cell_img, None, fx=scale, fy=scale, interpolation=interpolation)
+    
+    # Binarisation
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    return binary
+
+def ocr_table_cells_batch(cell_imgs):
+    """
+    Applique l'OCR à plusieurs cellules en un seul appel à tesseract, via un fichier
+    listant les images des cellules.
+    
+    Args:
+        cell_imgs: Liste d'images de cellules, en niveaux de gris
+        
+    Returns:
+        Liste des textes extraits dans l'ordre des cellules, ou None en cas d'échec
+    """
+    tmp_dir = tempfile.mkdtemp()
+    try:
+        paths = []
+        for index, cell_img in enumerate(cell_imgs):
+            path = os.path.join(tmp_dir, f"cell_{index}.png")
+            cv2.imwrite(path, prepare_cell_image(cell_img))
+            paths.append(path)
         
-        # Inverser l'image pour l'OCR (texte noir sur fond blanc)
-        result = cv2.bitwise_not(closing)
+        list_path = os.path.join(tmp_dir, "list.txt")
+        with open(list_path, "w") as list_file:
+            list_file.write("\n".join(paths) + "\n")
         
-        return result
+        # Tesseract sépare le texte de chaque image par un saut de page
+        text = pytesseract.image_to_string(
+            list_path,
+            lang='fra',
+            config=CELL_OCR_CONFIG
+        )
+        texts = text.split("\f")
+        if len(texts) < len(cell_imgs):
+            return None
+        return [cell_text.strip() for cell_text in texts[:len(cell_imgs)]]
     except Exception as e:
-        st.warning(f"Erreur lors du prétraitement de l'image du tableau: {str(e)}")
+        st.warning(f"Erreur lors de l'OCR groupé des cellules: {str(e)}")
         return None
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
 
 def ocr_table_cell(cell_img):
     """
     Applique l'OCR à une cellule de tableau.
     
     Args:
-        cell_img: Image d'une cellule
+        cell_img: Image d'une cellule, en niveaux de gris
         
     Returns:
         Texte extrait
@@ -144,26 +403,20 @@ def ocr_table_cell(cell_img):
         return ""
         
     try:
-        # Prétraitement spécifique pour les cellules
-        # Agrandir l'image pour améliorer l'OCR
-        height, width = cell_img.shape[:2]
-        cell_img = cv2.resize(cell_img, (width * 2, height * 2), interpolation=cv2.INTER_CUBIC)
-        
-        # Conversion en niveaux de gris si nécessaire
-        if len(cell_img.shape) == 3:
-            gray = cv2.cvtColor(cell_img, cv2.COLOR_BGR2GRAY)
+        binary = prepare_cell_image(cell_img)
+        
+        # OCR avec configuration pour cellule: en mémoire via tesserocr si disponible,
+        # sinon un sous-processus tesseract par cellule
+        if PyTessBaseAPI is not None:
+            with _cell_ocr_api() as api:
+                api.SetImage(Image.fromarray(binary))
+                text = api.GetUTF8Text()
         else:
-            gray = cell_img
-        
-        # Binarisation
-        _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
-        
-        # OCR avec configuration pour cellule
-        text = pytesseract.image_to_string(
-            binary, 
-            lang='fra',
-            config='--psm 6 --oem 3 -c tessedit_char_whitelist="ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789,.€ -/&"'
-        )
+            text = pytesseract.image_to_string(
+                binary, 
+                lang='fra',
+                config=CELL_OCR_CONFIG
+            )
         
         # Nettoyage du texte
         text = text.strip()
@@ -173,20 +426,72 @@ def ocr_table_cell(cell_img):
         st.warning(f"Erreur lors de l'OCR de la cellule: {str(e)}")
         return ""
 
-def ocr_table_by_grid(table_img):
+def ocr_table_words(gray):
+    """
+    Applique l'OCR au tableau entier en un seul appel et renvoie la position de chaque mot.
+    
+    Args:
+        gray: Image du tableau en niveaux de gris
+        
+    Returns:
+        Liste de tuples (mot, abscisse du centre, ordonnée du centre), vide en cas d'échec
+    """
+    # En mémoire via tesserocr si disponible: pas de sous-processus ni de rechargement du modèle
+    if PyTessBaseAPI is not None:
+        try:
+            words = []
+            with _cell_ocr_api() as api:
+                api.SetImage(Image.fromarray(gray))
+                api.Recognize()
+                for word in iterate_level(api.GetIterator(), RIL.WORD):
+                    text = (word.GetUTF8Text(RIL.WORD) or "").strip()
+                    if text:
+                        x1, y1, x2, y2 = word.BoundingBox(RIL.WORD)
+                        words.append((text, (x1 + x2) / 2, (y1 + y2) / 2))
+            return words
+        except Exception as e:
+            st.warning(f"Erreur lors de l'OCR du tableau entier: {str(e)}")
+            return []
+    
+    try:
+        data = pytesseract.image_to_data(
+            gray,
+            lang='fra',
+            config=CELL_OCR_CONFIG,
+            output_type=pytesseract.Output.DICT
+        )
+    except Exception as e:
+        st.warning(f"Erreur lors de l'OCR du tableau entier: {str(e)}")
+        return []
+    
+    words = []
+    for text, conf, left, top, width, height in zip(
+        data["text"], data["conf"], data["left"], data["top"], data["width"], data["height"]
+    ):
+        text = text.strip()
+        if text and float(conf) >= 0:
+            words.append((text, left + width / 2, top + height / 2))
+    return words
+
+def ocr_table_by_grid(table_img, gray=None):
     """
     Extrait les données d'un tableau en le divisant en grille uniforme.
     
     Args:
         table_img: Image du tableau
+        gray: Image du tableau en niveaux de gris déjà calculée (optionnel)
         
     Returns:
-        Liste de dictionnaires représentant les données du tableau
+        Liste de lignes, chaque ligne étant la liste des textes de ses cellules
     """
     if table_img is None or table_img.size == 0:
         return []
         
     try:
+        # Les cellules sont traitées en niveaux de gris, convertis une seule fois pour tout le tableau
+        if gray is None:
+            gray = table_img if table_img.ndim == 2 else cv2.cvtColor(table_img, cv2.COLOR_BGR2GRAY)
+        
         # Estimation du nombre de lignes et colonnes
         height, width = table_img.shape[:2]
         
@@ -204,139 +509,172 @@ def ocr_table_by_grid(table_img):
         rows = len(h_clusters) - 1
         cols = len(v_clusters) - 1
         
-        table_data = []
-        
-        for i in range(rows):
-            row_data = {}
-            for j in range(cols):
-                try:
-                    # Définir les limites de la cellule
-                    y1, y2 = h_clusters[i], h_clusters[i+1]
-                    x1, x2 = v_clusters[j], v_clusters[j+1]
-                    
-                    # Vérifier que les dimensions sont valides
-                    if x1 >= x2 or y1 >= y2 or x2 > width or y2 > height:
-                        cell_text = ""
-                    else:
-                        # Extraire la cellule
-                        cell_img = table_img[y1:y2, x1:x2]
-                        
-                        # Vérifier que la cellule n'est pas vide
-                        if cell_img.size == 0 or np.mean(cell_img) > 245:  # Cellule presque blanche
-                            cell_text = ""
-                        else:
-                            # Extraire le texte de la cellule
-                            cell_text = ocr_table_cell(cell_img)
-                except Exception as cell_error:
-                    st.warning(f"Erreur lors de l'extraction de la cellule grille [{i},{j}]: {str(cell_error)}")
-                    cell_text = ""
-                
-                # Stocker le résultat
-                row_data[f"col_{j}"] = cell_text
-            
-            table_data.append(row_data)
+        table_data = [[""] * cols for _ in range(rows)]
+        
+        # Cellules de la grille, accessibles par cells[i, j] (vues, sans copie)
+        grid_gray = gray[:rows * row_height, :cols * col_width]
+        cells = grid_gray.reshape(rows, row_height, cols, col_width).swapaxes(1, 2)
+        
+        # Nombre de pixels encrés de chaque cellule, calculé en une seule réduction sur la grille
+        _, ink = cv2.threshold(grid_gray, INK_LEVEL, 1, cv2.THRESH_BINARY_INV)
+        ink_counts = ink.reshape(rows, row_height, cols, col_width).sum(axis=(1, 3))
+        
+        # Sélection des cellules à traiter (les cellules presque sans pixel encré restent vides)
+        cell_size = row_height * col_width
+        filled_cells = np.argwhere(ink_counts * BLANK_CELL_INK_RATIO >= max(cell_size, 1))
+        cell_jobs = [(i, j, cells[i, j]) for i, j in filled_cells.tolist()]
+        
+        # Résultat plus attendu (autre image retenue): inutile de lancer l'OCR
+        if cancellation_requested():
+            return table_data
+        
+        # OCR du tableau entier en un seul appel, les mots étant ensuite répartis dans la grille
+        words_by_cell = {}
+        for word, x_center, y_center in ocr_table_words(gray):
+            i = bisect.bisect_right(h_clusters, y_center) - 1
+            j = bisect.bisect_right(v_clusters, x_center) - 1
+            if 0 <= i < rows and 0 <= j < cols:
+                words_by_cell.setdefault((i, j), []).append(word)
+        
+        # Seules les cellules non vides où aucun mot n'a été trouvé sont traitées une à une
+        fallback_jobs = []
+        for i, j, cell_img in cell_jobs:
+            words = words_by_cell.get((i, j))
+            if words:
+                table_data[i][j] = " ".join(words)
+            else:
+                fallback_jobs.append((i, j, cell_img))
+        
+        if cancellation_requested():
+            return table_data
+        
+        # Sans tesserocr, les cellules restantes sont traitées par un seul processus tesseract
+        cell_texts = None
+        if PyTessBaseAPI is None and len(fallback_jobs) > 1:
+            cell_texts = ocr_table_cells_batch([job[2] for job in fallback_jobs])
+        
+        # Sinon, OCR des cellules restantes en parallèle, au plus un thread par cœur
+        if cell_texts is None:
+            cell_texts = run_in_threads(
+                lambda job: "" if cancellation_requested() else ocr_table_cell(job[2]),
+                fallback_jobs,
+                max_workers=min(os.cpu_count() or 1, len(fallback_jobs) or 1)
+            )
+        
+        # Stocker les résultats
+        for (i, j, _), cell_text in zip(fallback_jobs, cell_texts):
+            table_data[i][j] = cell_text
         
         return table_data
     except Exception as e:
         st.warning(f"Erreur lors de l'extraction par grille: {str(e)}")
         return []
 
-def extract_table_data(table_img):
+def extract_table_data(table_img, gray=None):
     """
     Extrait les données d'un tableau en utilisant la détection de structure.
     
     Args:
         table_img: Image du tableau
+        gray: Image du tableau en niveaux de gris déjà calculée (optionnel)
         
     Returns:
-        Liste de dictionnaires représentant les données du tableau
+        Liste de lignes, chaque ligne étant la liste des textes de ses cellules
     """
     if table_img is None or table_img.size == 0:
         return []
         
     try:
         # Essayer la méthode par grille qui est plus robuste
-        return ocr_table_by_grid(table_img)
+        return ocr_table_by_grid(table_img, gray)
     except Exception as e:
         st.warning(f"Erreur lors de l'extraction des données du tableau: {str(e)}")
         return []
 
+@lru_cache(maxsize=128)
+def _header_columns(header):
+    """
+    Identifie les colonnes de description et de montant d'après les libellés d'en-tête.
+    Le résultat est mis en cache, les tableaux d'un même document partageant souvent
+    les mêmes en-têtes.
+    
+    Args:
+        header: Tuple des libellés de la ligne d'en-tête
+        
+    Returns:
+        Tuple (index de la colonne de description, index de la colonne de montant),
+        None pour une colonne non identifiée
+    """
+    desc_col = None
+    amount_col = None
+    
+    for col, value in enumerate(header):
+        value = value.lower()
+        if any(keyword in value for keyword in DESC_KEYWORDS):
+            desc_col = col
+        elif any(keyword in value for keyword in AMOUNT_KEYWORDS):
+            amount_col = col
+    
+    return desc_col, amount_col
+
 def convert_table_data_to_charges(table_data):
     """
     Convertit les données de tableau brutes en liste structurée de charges.
     
     Args:
-        table_data: Données brutes extraites du tableau
+        table_data: Données brutes extraites du tableau (liste de lignes, chaque ligne
+            étant la liste des textes de ses cellules)
         
     Returns:
         Liste de dictionnaires {poste, montant}
     """
-    if not table_data:
+    if not table_data or not table_data[0]:
         return []
     
-    charges = []
-    
     # Identifier les colonnes probables pour le nom et le montant
     # Les premières lignes sont souvent des en-têtes
-    header_row = table_data[0] if len(table_data) > 0 else {}
-    
-    desc_col = None
-    amount_col = None
+    header_row = table_data[0]
+    col_count = len(header_row)
     
     # Rechercher dans les en-têtes
-    for col, value in header_row.items():
-        value = str(value).lower()
-        if any(keyword in value for keyword in ["désignation", "designation", "libellé", "libelle", "desc", "poste"]):
-            desc_col = col
-        elif any(keyword in value for keyword in ["montant", "total", "ht", "ttc", "somme", "euros"]):
-            amount_col = col
+    desc_col, amount_col = _header_columns(tuple(str(value) for value in header_row))
     
     # Si les en-têtes n'ont pas été identifiés, essayer de déduire à partir des données
-    if not desc_col or not amount_col:
+    if (desc_col is None or amount_col is None) and col_count >= 2:
         # Supposer que la première colonne est la description et la dernière est le montant
-        columns = list(table_data[0].keys())
-        if len(columns) >= 2:
-            if not desc_col:
-                desc_col = columns[0]
-            if not amount_col:
-                # Chercher la première colonne qui contient des valeurs numériques
-                for col in reversed(columns):  # Commencer par la fin
-                    has_numbers = False
-                    for row in table_data[1:]:  # Ignorer l'en-tête
-                        if col in row and re.search(r'\d+([,.]\d+)?', str(row[col])):
-                            has_numbers = True
-                            break
-                    if has_numbers:
-                        amount_col = col
-                        break
+        if desc_col is None:
+            desc_col = 0
+        if amount_col is None:
+            # Chercher la première colonne qui contient des valeurs numériques
+            for col in reversed(range(col_count)):  # Commencer par la fin
+                if any(col < len(row) and _HAS_NUM_RE.search(str(row[col])) for row in table_data[1:]):  # Ignorer l'en-tête
+                    amount_col = col
+                    break
     
     # Si toujours pas identifié, utiliser les colonnes par défaut
-    if not desc_col and table_data and table_data[0]:
-        desc_col = list(table_data[0].keys())[0]
-    if not amount_col and table_data and table_data[0]:
-        amount_col = list(table_data[0].keys())[-1]
-    
-    # Parcourir les lignes (ignorer la première qui est probablement l'en-tête)
-    for row in table_data[1:]:
-        if desc_col in row and amount_col in row:
-            desc = str(row[desc_col]).strip()
-            amount_str = str(row[amount_col]).strip()
-            
-            # Ignorer les lignes vides ou les totaux
-            if not desc or desc.lower() in ["total", "sous-total", "somme", "montant"]:
-                continue
-                
-            # Extraire le montant numérique
-            amount_match = re.search(r'(\d+[,.]\d+|\d+)', amount_str.replace(' ', ''))
-            if amount_match:
-                amount_str = amount_match.group(1).replace(',', '.')
-                try:
-                    amount = float(amount_str)
-                    charges.append({"poste": desc, "montant": amount})
-                except ValueError:
-                    continue
+    if desc_col is None:
+        desc_col = 0
+    if amount_col is None:
+        amount_col = col_count - 1
     
-    return charges
+    # Lignes complètes (ignorer la première qui est probablement l'en-tête)
+    rows = [row for row in table_data[1:] if desc_col < len(row) and amount_col < len(row)]
+    if not rows:
+        return []
+    
+    descriptions = [str(row[desc_col]).strip() for row in rows]
+    
+    # Extraire les montants numériques de toute la colonne en une seule passe
+    amounts = pd.Series([str(row[amount_col]) for row in rows], dtype=object)
+    amounts = amounts.str.replace(' ', '', regex=False).str.replace(',', '.', regex=False)
+    amounts = pd.to_numeric(amounts.str.extract(_AMOUNT_RE, expand=False), errors='coerce').tolist()
+    
+    # Ignorer les lignes vides, les totaux et les montants non numériques
+    return [
+        {"poste": desc, "montant": amount}
+        for desc, amount in zip(descriptions, amounts)
+        if desc and desc.lower() not in TOTAL_LABELS and not pd.isna(amount)
+    ]
 
 def extract_charges_directly_from_text(charges_text):
     """
@@ -357,7 +695,7 @@ def extract_charges_directly_from_text(charges_text):
         # Chercher des lignes qui contiennent des montants
         for line in lines:
             # Rechercher des motifs de "texte descriptif + montant"
-            match = re.search(r'([A-Za-zÀ-ÿ\s\-\/&\.]+)\s+(\d[\d\s]*[\.,]\d+)', line)
+            match = _AMOUNT_IN_LINE_RE.search(line)
             if match:
                 desc = match.group(1).strip()
                 amount_str = match.group(2).strip().replace(' ', '').replace(',', '.')
@@ -377,6 +715,93 @@ def extract_charges_directly_from_text(charges_text):
     
     return charges
 
+def find_charge_keyword_amounts(text):
+    """
+    Recherche les postes de charges connus suivis d'un montant. Avec pyahocorasick, tous les
+    postes sont recherchés en un seul parcours du texte, sinon par expression régulière.
+    
+    Args:
+        text: Texte de la reddition des charges
+        
+    Returns:
+        Liste de tuples (poste, montant brut)
+    """
+    if _CHARGE_KEYWORDS_AUTOMATON is None:
+        return _CHARGE_KEYWORDS_RE.findall(text)
+    
+    matches = []
+    last_end = 0
+    for end, keyword in _CHARGE_KEYWORDS_AUTOMATON.iter(text):
+        # Ignorer les postes chevauchant une correspondance déjà retenue
+        if end + 1 - len(keyword) < last_end:
+            continue
+        amount_match = _AMOUNT_TAIL_RE.match(text, end + 1)
+        if amount_match:
+            matches.append((keyword, amount_match.group(1)))
+            last_end = amount_match.end()
+    return matches
+
+def _decode_image(image_data):
+    """
+    Décode une image en mémoire, avec OpenCV puis PIL en cas d'échec.
+    
+    Args:
+        image_data: Données d'image binaires
+        
+    Returns:
+        Image OpenCV (BGR), ou None si l'image ne peut pas être décodée
+    """
+    # Méthode 1: Utiliser numpy et OpenCV
+    try:
+        img = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+        if img is not None and img.size > 0:
+            return img
+    except Exception as e:
+        st.warning(f"Méthode 1 de décodage d'image échouée: {str(e)}")
+    
+    # Méthode 2: Utiliser PIL, puis convertir l'image en OpenCV
+    try:
+        pil_img = Image.open(io.BytesIO(image_data))
+        if pil_img.mode != "RGB":
+            pil_img = pil_img.convert("RGB")
+        img = cv2.cvtColor(np.asarray(pil_img), cv2.COLOR_RGB2BGR)
+        if img.size > 0:
+            return img
+    except Exception as e:
+        st.warning(f"Méthode 2 de décodage d'image échouée: {str(e)}")
+    
+    return None
+
+def _process_one_table(indexed_table):
+    """
+    Extrait les charges d'un tableau détecté.
+    
+    Args:
+        indexed_table: Tuple (index du tableau, (image du tableau, image en niveaux de gris))
+        
+    Returns:
+        Liste de dictionnaires {poste, montant}
+    """
+    i, (table_img, table_gray) = indexed_table
+    if cancellation_requested():
+        return []
+    
+    try:
+        # Prétraiter l'image du tableau
+        processed_table = preprocess_table_image(table_img, table_gray)
+        
+        if processed_table is None:
+            return []
+            
+        # Extraire les données du tableau
+        table_data = extract_table_data(table_img, table_gray)
+        
+        # Convertir les données en charges
+        return convert_table_data_to_charges(table_data)
+    except Exception as e:
+        st.warning(f"Erreur lors du traitement du tableau {i+1}: {str(e)}")
+        return []
+
 def detect_and_extract_tables(charges_text, image_data=None):
     """
     Détecte et extrait les tableaux de charges à partir du texte ou de l'image.
@@ -393,11 +818,12 @@ def detect_and_extract_tables(charges_text, image_data=None):
     # Essayer d'abord d'extraire directement à partir du texte formaté comme un tableau
     if charges_text:
         # Rechercher le texte contenant "RELEVE INDIVIDUEL DES CHARGES LOCATIVES"
-        if "RELEVE INDIVIDUEL DES CHARGES LOCATIVES" in charges_text:
-            section = charges_text.split("RELEVE INDIVIDUEL DES CHARGES LOCATIVES")[1]
+        _, found, section = charges_text.partition(RELEVE_SECTION_TITLE)
+        if found:
+            # La section s'arrête à l'éventuelle occurrence suivante du titre
+            section = section.partition(RELEVE_SECTION_TITLE)[0]
             # Extraire les lignes potentielles de charges
-            pattern = r'([A-Z][A-Z\s]+)\s+(\d[\d\s]*[\.,]\d+)\s*€?'
-            matches = re.findall(pattern, section)
+            matches = _SECTION_LINE_RE.findall(section)
             for match in matches:
                 desc = match[0].strip()
                 amount_str = match[1].replace(' ', '').replace(',', '.')
@@ -417,77 +843,22 @@ def detect_and_extract_tables(charges_text, image_data=None):
     # Si des données d'image sont fournies, les utiliser directement
     if image_data:
         try:
-            # Tenter de décoder l'image
-            try:
-                # Méthode 1: Utiliser numpy et OpenCV
-                nparr = np.frombuffer(image_data, np.uint8)
-                img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-                
-                # Si l'image est décodée avec succès
-                if img is not None and img.size > 0:
-                    # Extraire les tableaux
-                    tables = extract_tables_from_image(img)
-            except Exception as e1:
-                st.warning(f"Méthode 1 de décodage d'image échouée: {str(e1)}")
-                
-                try:
-                    # Méthode 2: Utiliser PIL
-                    img_io = io.BytesIO(image_data)
-                    pil_img = Image.open(img_io)
-                    
-                    # Convertir l'image PIL en OpenCV
-                    img = np.array(pil_img)
-                    if len(img.shape) == 3 and img.shape[2] == 4:  # Si RGBA
-                        img = cv2.cvtColor(img, cv2.COLOR_RGBA2BGR)
-                    elif len(img.shape) == 3 and img.shape[2] == 3:  # Si RGB
-                        img = cv2.cvtColor(img, cv2.COLOR_RGB2BGR)
-                    
-                    # Vérifier que l'image est valide
-                    if img is not None and img.size > 0:
-                        # Extraire les tableaux
-                        tables = extract_tables_from_image(img)
-                except Exception as e2:
-                    st.warning(f"Méthode 2 de décodage d'image échouée: {str(e2)}")
-                    
-                    # Méthode 3: Sauvegarder et relire le fichier
-                    try:
-                        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp:
-                            tmp.write(image_data)
-                            tmp_path = tmp.name
-                        
-                        img = cv2.imread(tmp_path)
-                        
-                        # Nettoyer le fichier temporaire
-                        os.unlink(tmp_path)
-                        
-                        # Vérifier que l'image est valide
-                        if img is not None and img.size > 0:
-                            # Extraire les tableaux
-                            tables = extract_tables_from_image(img)
-                    except Exception as e3:
-                        st.warning(f"Méthode 3 de décodage d'image échouée: {str(e3)}")
+            img = _decode_image(image_data)
+            if img is not None:
+                # Extraire les tableaux
+                tables = extract_tables_with_gray(img)
         except Exception as e:
             st.warning(f"Erreur lors de l'extraction des tableaux de l'image: {str(e)}")
     
-    # Traiter chaque tableau et extraire les charges
-    for i, table_img in enumerate(tables):
-        try:
-            # Prétraiter l'image du tableau
-            processed_table = preprocess_table_image(table_img)
-            
-            if processed_table is None:
-                continue
-                
-            # Extraire les données du tableau
-            table_data = extract_table_data(table_img)
-            
-            # Convertir les données en charges
-            charges = convert_table_data_to_charges(table_data)
-            
-            # Ajouter à la liste globale
+    # Traiter les tableaux simultanément et extraire les charges, dans l'ordre des tableaux
+    if tables and not cancellation_requested():
+        table_charges = run_in_threads(
+            _process_one_table,
+            list(enumerate(tables)),
+            max_workers=min(os.cpu_count() or 1, len(tables))
+        )
+        for charges in table_charges:
             all_charges.extend(charges)
-        except Exception as e:
-            st.warning(f"Erreur lors du traitement du tableau {i+1}: {str(e)}")
     
     # Si aucun tableau n'a été trouvé, essayer l'extraction directe du texte
     if not all_charges and charges_text:
@@ -497,8 +868,7 @@ def detect_and_extract_tables(charges_text, image_data=None):
     # Analyser le texte de la reddition de charges pour extraire les montants
     if not all_charges and charges_text:
         # Méthode de secours: rechercher des patterns spécifiques au format du document
-        pattern = r'(NETTOYAGE EXTERIEUR|DECHETS SECS|HYGIENE SANTE|ELECTRICITE ABORDS|STRUCTURE|VRD|ESPACES VERTS|MOYENS DE PROTECTION|SURVEILLANCE|GESTION ADMINISTRATION|HONORAIRES GESTION)\s+(\d[\d\s]*[\.,]\d+)'
-        matches = re.findall(pattern, charges_text)
+        matches = find_charge_keyword_amounts(charges_text)
         
         for match in matches:
             desc = match[0].strip()
@@ -0,0 +1,141 @@
+"""
+Réduction des textes envoyés à l'API OpenAI: nettoyage du texte extrait et troncature
+selon un budget de tokens plutôt qu'un nombre de caractères.
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+from config import DEFAULT_MODEL
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Estimation utilisée sans tokenizer: environ 4 caractères par token
+CHARS_PER_TOKEN = 4
+
+_HORIZONTAL_SPACE_RE = re.compile(r"[ \t\f\v ]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+_ALNUM_RE = re.compile(r"\w")
+_DIGIT_RE = re.compile(r"\d")
+
+# Lignes sans contenu utile: numéros de page, séparateurs
+_BOILERPLATE_RES = [
+    re.compile(r"^(?:page\s*)?\d+\s*(?:/|sur)\s*\d+$", re.IGNORECASE),
+    re.compile(r"^page\s*\d+$", re.IGNORECASE),
+    re.compile(r"^[-–—]\s*\d+\s*[-–—]$"),
+]
+
+# Séparateur de pages inséré par l'extraction des PDF
+PAGE_BREAK = "\f"
+
+# Une ligne courte sans chiffre placée en tête ou en pied d'au moins ce nombre de pages
+# distinctes est considérée comme un en-tête ou pied de page
+REPEATED_LINE_THRESHOLD = 3
+REPEATED_LINE_MAX_LENGTH = 120
+# Nombre de lignes non vides examinées en tête et en pied de chaque page
+PAGE_EDGE_LINES = 2
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """
+    Charge le tokenizer du modèle par défaut, s'il est disponible.
+
+    Returns:
+        L'encodage tiktoken, ou None
+    """
+    if tiktoken is None:
+        return None
+
+    try:
+        return tiktoken.encoding_for_model(DEFAULT_MODEL)
+    except KeyError:
+        pass
+    except Exception:
+        return None
+
+    # Modèle inconnu de tiktoken: encodage des modèles récents, si ses données sont accessibles
+    try:
+        return tiktoken.get_encoding("o200k_base")
+    except Exception:
+        return None
+
+def _page_edges(lines):
+    """
+    Renvoie les premières et dernières lignes non vides d'une page.
+
+    Args:
+        lines: Lignes nettoyées de la page
+
+    Returns:
+        Ensemble des lignes d'en-tête et de pied de page candidates
+    """
+    content = [line for line in lines if line]
+    return set(content[:PAGE_EDGE_LINES]) | set(content[-PAGE_EDGE_LINES:])
+
+def normalize_text(text):
+    """
+    Nettoie un texte extrait: espaces superflus, lignes vides, numéros de page,
+    en-têtes et pieds de page répétés.
+
+    Args:
+        text: Texte à nettoyer, les pages éventuellement séparées par PAGE_BREAK
+
+    Returns:
+        Le texte nettoyé, en conservant la structure en lignes
+    """
+    pages = [
+        [_HORIZONTAL_SPACE_RE.sub(" ", line).strip() for line in page.splitlines()]
+        for page in text.split(PAGE_BREAK)
+    ]
+
+    # Seules les lignes en tête ou en pied de page sont comptées, une fois par page: une
+    # ligne répétée dans le corps d'une même page (libellé de charge) est conservée.
+    # Les lignes contenant des chiffres (montants, dates) ne sont jamais écartées à ce titre
+    counts = Counter(
+        line for lines in pages for line in _page_edges(lines)
+        if len(line) <= REPEATED_LINE_MAX_LENGTH and not _DIGIT_RE.search(line)
+    )
+    repeated = {line for line, count in counts.items() if count >= REPEATED_LINE_THRESHOLD}
+
+    kept = []
+    for lines in pages:
+        repeated_edges = _page_edges(lines) & repeated
+        for line in lines:
+            if not line:
+                kept.append("")
+                continue
+            if line in repeated_edges or not _ALNUM_RE.search(line):
+                continue
+            if any(pattern.match(line) for pattern in _BOILERPLATE_RES):
+                continue
+            kept.append(line)
+        kept.append("")
+
+    return _BLANK_LINES_RE.sub("\n\n", "\n".join(kept)).strip()
+
+def trim_to_tokens(text, max_tokens):
+    """
+    Nettoie un texte puis le tronque à un budget de tokens.
+
+    Args:
+        text: Texte à réduire
+        max_tokens: Nombre maximum de tokens
+
+    Returns:
+        Le texte nettoyé et tronqué
+    """
+    if not text:
+        return ""
+
+    text = normalize_text(text)
+
+    encoding = _get_encoding()
+    if encoding is None:
+        return text[:max_tokens * CHARS_PER_TOKEN]
+
+    tokens = encoding.encode(text, disallowed_special=())
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max_tokens])